@@ -12,7 +12,16 @@ a = Analysis(
     binaries=[],
     datas=[
         (os.path.join(parent_dir, 'game_logic.py'), '.'),
-        (os.path.join(parent_dir, 'renderer.py'), '.')
+        (os.path.join(parent_dir, 'renderer.py'), '.'),
+        (os.path.join(parent_dir, 'bitboard.py'), '.'),
+        (os.path.join(parent_dir, 'engine.py'), '.'),
+        (os.path.join(parent_dir, 'zobrist.py'), '.'),
+        (os.path.join(parent_dir, 'transposition.py'), '.'),
+        (os.path.join(parent_dir, 'search.py'), '.'),
+        (os.path.join(parent_dir, 'adjudication.py'), '.'),
+        (os.path.join(parent_dir, 'selfplay.py'), '.'),
+        (os.path.join(parent_dir, 'symmetry.py'), '.'),
+        (os.path.join(parent_dir, 'opening_book.py'), '.')
     ],
     hiddenimports=[],
     hookspath=[],
@@ -0,0 +1,88 @@
+"""Early detection of decided games.
+
+A game is only called early by a last-turn check: once three of the four
+pieces are apart, a single wall can split the last shared region, so
+adjudicate() plays every legal turn and, if each one ends the game with the
+same winner, the game is decided. Territory alone never decides a game,
+because the owner of a region may wall off any part of it on its own turns
+(by choice, or because that piece is the only one it can move), so nothing
+beyond a piece's own cell is ever certain.
+
+The other fields are informational. Walls are never removed and pieces never
+leave their region, so maximum (every region the player has a piece in,
+minus one cell for each opposing piece in it) is an upper bound on the final
+score. The projected score (sealed regions counted in full, contested ones
+split per piece) is only an estimate.
+"""
+
+from bitboard import popcount
+
+
+class Adjudication:
+    def __init__(self, maximum, projected, sealed, winner):
+        self.maximum = maximum      # [Red, Blue] most cells each player can still end up with
+        self.projected = projected  # [Red, Blue] expected final score, contested regions split per piece
+        self.sealed = sealed        # [Red, Blue] sizes of each player's sealed regions
+        self.winner = winner        # 0 or 1, -1 for a settled tie, None while the outcome is open
+
+    @property
+    def decided(self):
+        return self.winner is not None
+
+    def __repr__(self):
+        return (f"Adjudication(maximum={self.maximum}, projected={self.projected}, "
+                f"sealed={self.sealed}, winner={self.winner})")
+
+
+def adjudicate(engine):
+    """Analyse the territory of a position and return an Adjudication."""
+    if engine.phase == "game_over":
+        areas = engine.calculate_enclosed_areas()
+        final = [sum(areas[0]), sum(areas[1])]
+        return Adjudication(final, list(final), [list(areas[0]), list(areas[1])], engine.winner)
+
+    regions = engine.piece_regions()
+    maximum = [0, 0]
+    projected = [0.0, 0.0]
+    sealed = [[], []]
+
+    for region in dict.fromkeys(regions):
+        size = popcount(region)
+        owners = [index // 2 for index, other in enumerate(regions) if other == region]
+        if len(set(owners)) == 1:
+            player = owners[0]
+            maximum[player] += size
+            projected[player] += size
+            sealed[player].append(size)
+            continue
+
+        # Contested: every opposing piece keeps at least its own cell
+        for player in range(2):
+            pieces = owners.count(player)
+            maximum[player] += size - (len(owners) - pieces)
+            projected[player] += size * pieces / len(owners)
+
+    winner = None
+    if len(set(regions)) == 3:
+        winner = last_turn_winner(engine)
+
+    return Adjudication(maximum, projected, sealed, winner)
+
+
+def last_turn_winner(engine):
+    """The winner if every legal turn ends the game with the same result, else None.
+
+    Only worth asking when three of the four pieces are already apart, so
+    that a single wall can split the last shared region.
+    """
+    winners = set()
+    for action in engine.legal_actions():
+        record = engine.apply_turn(action)
+        over = engine.phase == "game_over"
+        winners.add(engine.winner)
+        engine.undo_turn(record)
+        if not over or len(winners) > 1:
+            break
+    if not winners or not over or len(winners) > 1:
+        return None
+    return winners.pop()
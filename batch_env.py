@@ -0,0 +1,237 @@
+"""Batched WallGo environment stepping many games in lockstep with NumPy.
+
+Walls and pieces of N games live in arrays that mirror GameState:
+- h_walls (N, size + 1, size) is walls[0] of every game
+- v_walls (N, size, size + 1) is walls[1] of every game
+- pieces (N, 4, 2) holds (row, col) of Red 1, Red 2, Blue 1 and Blue 2
+
+Legal-move masks, applying actions and the game over check run as array
+operations over the whole batch. Actions use the same encoding as
+engine.encode_action(), so masks line up with GameEngine.legal_actions().
+"""
+
+import numpy as np
+from engine import GameEngine
+
+
+class BatchWallGo:
+    def __init__(self, num_games, board_size=7, seed=None):
+        self.num_games = num_games
+        self.board_size = board_size
+        self.num_actions = 2 * board_size * board_size * 4
+        self.rng = np.random.default_rng(seed)
+
+        self.h_walls = np.zeros((num_games, board_size + 1, board_size), dtype=bool)
+        self.v_walls = np.zeros((num_games, board_size, board_size + 1), dtype=bool)
+        self.pieces = np.zeros((num_games, 4, 2), dtype=np.int64)
+        self.current_player = np.zeros(num_games, dtype=np.int8)
+        self.done = np.zeros(num_games, dtype=bool)
+        self.winner = np.full(num_games, -1, dtype=np.int8)  # -1 is a tie (or not finished)
+        self.areas = np.zeros((num_games, 4), dtype=np.int64)  # Final enclosed area per piece
+
+        self.reset()
+
+    def reset(self, games=None):
+        """Start new games with random setups (all games, or the given indices)."""
+        if games is None:
+            games = np.arange(self.num_games)
+        games = np.asarray(games)
+        size = self.board_size
+        count = len(games)
+
+        self.h_walls[games] = False
+        self.v_walls[games] = False
+        self.h_walls[games, 0, :] = True
+        self.h_walls[games, size, :] = True
+        self.v_walls[games, :, 0] = True
+        self.v_walls[games, :, size] = True
+
+        # Four distinct cells per game
+        cells = self.rng.random((count, size * size)).argsort(axis=1)[:, :4]
+        self.pieces[games, :, 0] = cells // size
+        self.pieces[games, :, 1] = cells % size
+
+        self.current_player[games] = self.rng.integers(0, 2, count)
+        self.done[games] = False
+        self.winner[games] = -1
+        self.areas[games] = 0
+
+    def load_game(self, game, engine):
+        """Copy a GameEngine position into one slot of the batch."""
+        if engine.board_size != self.board_size:
+            raise ValueError(f"Engine board size {engine.board_size} does not match the batch size {self.board_size}")
+        self.h_walls[game] = engine.walls[0]
+        self.v_walls[game] = engine.walls[1]
+        self.pieces[game] = [piece for player_pieces in engine.pieces for piece in player_pieces]
+        self.current_player[game] = engine.current_player
+        self.done[game] = engine.phase == "game_over"
+        self.winner[game] = engine.winner if engine.winner is not None else -1
+        self.areas[game] = 0
+
+    def to_engine(self, game):
+        """Build a GameEngine holding the position of one game of the batch."""
+        engine = GameEngine(board_size=self.board_size)
+        engine.place_pieces([tuple(int(value) for value in piece) for piece in self.pieces[game]])
+        for wall_type, walls in enumerate((self.h_walls[game], self.v_walls[game])):
+            for row, col in zip(*np.nonzero(walls)):
+                if not engine.walls[wall_type][row][col]:
+                    engine.place_wall(wall_type, int(row), int(col))
+        engine.set_current_player(int(self.current_player[game]))
+        engine.update_isolated_pieces()
+        return engine
+
+    # Per-cell passability, shape (N, size, size) each
+
+    def open_sides(self, games=slice(None)):
+        """Return (up, right, down, left): True where the cell has no wall on that side."""
+        h_walls = self.h_walls[games]
+        v_walls = self.v_walls[games]
+        return ~h_walls[:, :-1, :], ~v_walls[:, :, 1:], ~h_walls[:, 1:, :], ~v_walls[:, :, :-1]
+
+    @staticmethod
+    def neighbours(mask, sides):
+        """Cells one unblocked step away from any cell of the (N, size, size) mask."""
+        up, right, down, left = sides
+        result = np.zeros_like(mask)
+        result[:, :-1, :] |= mask[:, 1:, :] & up[:, 1:, :]
+        result[:, 1:, :] |= mask[:, :-1, :] & down[:, :-1, :]
+        result[:, :, :-1] |= mask[:, :, 1:] & left[:, :, 1:]
+        result[:, :, 1:] |= mask[:, :, :-1] & right[:, :, :-1]
+        return result
+
+    def occupancy(self, games=slice(None)):
+        pieces = self.pieces[games]
+        count = pieces.shape[0]
+        occupied = np.zeros((count, self.board_size, self.board_size), dtype=bool)
+        occupied[np.repeat(np.arange(count), 4), pieces[:, :, 0].ravel(), pieces[:, :, 1].ravel()] = True
+        return occupied
+
+    def legal_action_mask(self):
+        """Return an (N, num_actions) bool mask of legal turns for the side to move.
+
+        Finished games have no legal actions.
+        """
+        size = self.board_size
+        count = self.num_games
+        sides = self.open_sides()
+        occupied = self.occupancy()
+        free_sides = np.stack(sides, axis=-1)  # (N, size, size, 4) in SIDE_TOP .. SIDE_LEFT order
+        game_index = np.arange(count)
+
+        masks = []
+        for piece in range(2):
+            slot = self.current_player * 2 + piece
+            origin = np.zeros((count, size, size), dtype=bool)
+            origin[game_index, self.pieces[game_index, slot, 0], self.pieces[game_index, slot, 1]] = True
+
+            around = self.neighbours(origin, sides)
+            one_step = around & ~occupied
+            two_step = self.neighbours(one_step, sides) & ~occupied & ~origin
+
+            # Isolated pieces cannot move, not even to stay in place
+            movable = around.any(axis=(1, 2)) & ~self.done
+            destinations = (one_step | two_step | origin) & movable[:, None, None]
+            masks.append((destinations[..., None] & free_sides).reshape(count, size * size * 4))
+
+        return np.concatenate(masks, axis=1)
+
+    def step(self, actions):
+        """Play one turn in every unfinished game.
+
+        actions is an (N,) integer array; entries for finished games (or
+        negative entries) are ignored. Actions are assumed legal, check them
+        against legal_action_mask() first if they come from an untrusted source.
+        Returns the (done, winner) arrays.
+        """
+        actions = np.asarray(actions)
+        size = self.board_size
+        games = np.nonzero(~self.done & (actions >= 0))[0]
+        if len(games) == 0:
+            return self.done, self.winner
+        actions = actions[games]
+
+        side = actions % 4
+        cell = (actions // 4) % (size * size)
+        piece = actions // (4 * size * size)
+        row = cell // size
+        col = cell % size
+
+        # Move the pieces
+        slot = self.current_player[games] * 2 + piece
+        self.pieces[games, slot, 0] = row
+        self.pieces[games, slot, 1] = col
+
+        # Add the walls
+        top, right, bottom, left = side == 0, side == 1, side == 2, side == 3
+        self.h_walls[games[top], row[top], col[top]] = True
+        self.h_walls[games[bottom], row[bottom] + 1, col[bottom]] = True
+        self.v_walls[games[left], row[left], col[left]] = True
+        self.v_walls[games[right], row[right], col[right] + 1] = True
+
+        # Game over when all four pieces are in different regions
+        labels = self.region_labels(games)
+        pieces = self.pieces[games]
+        game_index = np.arange(len(games))[:, None]
+        piece_labels = labels[game_index, pieces[:, :, 0], pieces[:, :, 1]]  # (n, 4)
+        sorted_labels = np.sort(piece_labels, axis=1)
+        over = (sorted_labels[:, 1:] != sorted_labels[:, :-1]).all(axis=1)
+
+        if over.any():
+            finished = games[over]
+            region_sizes = (labels[over][:, None, :, :] == piece_labels[over][:, :, None, None]).sum(axis=(2, 3))
+            self.areas[finished] = region_sizes
+            red = region_sizes[:, :2].sum(axis=1)
+            blue = region_sizes[:, 2:].sum(axis=1)
+            self.winner[finished] = np.where(red > blue, 0, np.where(blue > red, 1, -1))
+            self.done[finished] = True
+
+        # Switch sides, unless both of the opponent's pieces are isolated
+        playing = games[~over]
+        if len(playing):
+            opponent = 1 - self.current_player[playing]
+            self.current_player[playing] = np.where(self.isolated(playing, opponent).all(axis=1),
+                                                    self.current_player[playing], opponent)
+
+        return self.done, self.winner
+
+    def isolated(self, games, player):
+        """(n, 2) bool: which pieces of the given player (per game) are walled in on all sides."""
+        result = np.empty((len(games), 2), dtype=bool)
+        for piece in range(2):
+            slot = player * 2 + piece
+            row = self.pieces[games, slot, 0]
+            col = self.pieces[games, slot, 1]
+            result[:, piece] = (self.h_walls[games, row, col] & self.h_walls[games, row + 1, col] &
+                                self.v_walls[games, row, col] & self.v_walls[games, row, col + 1])
+        return result
+
+    def region_labels(self, games=slice(None)):
+        """Label connected regions: (n, size, size) array, equal labels share a region.
+
+        Every cell starts with its own index and repeatedly takes the smallest
+        label of its open neighbours until nothing changes.
+        """
+        size = self.board_size
+        up, right, down, left = self.open_sides(games)
+        count = up.shape[0]
+        big = size * size
+        labels = np.broadcast_to(np.arange(big).reshape(size, size), (count, size, size)).copy()
+        while True:
+            previous = labels
+            labels = labels.copy()
+            np.minimum(labels[:, 1:, :], np.where(up[:, 1:, :], previous[:, :-1, :], big), out=labels[:, 1:, :])
+            np.minimum(labels[:, :-1, :], np.where(down[:, :-1, :], previous[:, 1:, :], big), out=labels[:, :-1, :])
+            np.minimum(labels[:, :, 1:], np.where(left[:, :, 1:], previous[:, :, :-1], big), out=labels[:, :, 1:])
+            np.minimum(labels[:, :, :-1], np.where(right[:, :, :-1], previous[:, :, 1:], big), out=labels[:, :, :-1])
+            if np.array_equal(labels, previous):
+                return labels
+
+    def sample_actions(self, mask=None):
+        """Pick a uniformly random legal action per game (-1 for games without one)."""
+        if mask is None:
+            mask = self.legal_action_mask()
+        weights = self.rng.random(mask.shape) * mask
+        actions = weights.argmax(axis=1)
+        actions[~mask.any(axis=1)] = -1
+        return actions
+
@@ -0,0 +1,434 @@
+"""Benchmarks for the rules and rendering hot paths.
+
+Every benchmark runs on the same seeded positions, so two runs on the same
+machine are directly comparable. Results are written as JSON with per-call
+percentiles; pass --baseline to compare against an earlier result file.
+
+Examples:
+    python benchmark.py --out baseline.json
+    python benchmark.py --baseline baseline.json --threshold 0.1
+    python benchmark.py --filter render --samples 50
+
+The rendering benchmarks draw to an offscreen surface (SDL's dummy video
+driver), so they run without a window.
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+from engine import GameEngine, MAX_BOARD_SIZE
+from search import evaluate, AnalysisHint, SearchResult
+from selfplay import random_setup
+from territory import voronoi
+
+# Seeds and turn counts of the benchmark positions (opening, middle game, late game)
+POSITION_SEEDS = tuple(range(1, 9))
+POSITION_TURNS = (0, 10, 25)
+
+PERCENTILES = (50, 90, 99)
+
+WINDOW_SIZE = 800
+
+
+def benchmark_positions(seeds=POSITION_SEEDS, turns=POSITION_TURNS, board_size=7):
+    """Games with a seeded setup and the given number of seeded random turns played.
+
+    Games that end before reaching the turn count are left out.
+    """
+    positions = []
+    for seed in seeds:
+        for count in turns:
+            rng = random.Random(seed)
+            engine = GameEngine(board_size=board_size)
+            random_setup(engine, rng)
+            for _ in range(count):
+                actions = engine.legal_actions()
+                if engine.phase != "select" or not actions:
+                    break
+                engine.apply_action(actions[rng.randrange(len(actions))])
+            if engine.phase == "select":
+                positions.append(engine)
+    return positions
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, min(len(sorted_values) - 1, math.ceil(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(times, calls):
+    """Statistics of per-call times in microseconds."""
+    times = sorted(times)
+    stats = {
+        "calls_per_sample": calls,
+        "samples": len(times),
+        "min": times[0],
+        "mean": sum(times) / len(times),
+        "max": times[-1]
+    }
+    for percent in PERCENTILES:
+        stats[f"p{percent}"] = percentile(times, percent)
+    return {key: round(value, 3) if isinstance(value, float) else value for key, value in stats.items()}
+
+
+def measure(run, calls, samples, warmup=3):
+    """Time run() samples times and return the statistics per call in microseconds.
+
+    run() makes `calls` calls of the benchmarked function; timing a batch keeps
+    the timer overhead out of the sub-microsecond functions. A run() that only
+    wants part of its work timed measures itself and returns the nanoseconds.
+    """
+    for _ in range(warmup):
+        run()
+    times = []
+    for _ in range(samples):
+        start = time.perf_counter_ns()
+        elapsed = run()
+        if elapsed is None:
+            elapsed = time.perf_counter_ns() - start
+        times.append(elapsed / 1000 / calls)
+    return summarize(times, calls)
+
+
+# Rules benchmarks: each builder takes the positions and returns (run, calls)
+
+def bench_get_valid_moves(positions):
+    pieces = [(engine, piece) for engine in positions for piece in engine.pieces[engine.current_player]]
+
+    def run():
+        for engine, piece in pieces:
+            engine.get_valid_moves(piece)
+    return run, len(pieces)
+
+
+def bench_is_valid_move(positions):
+    # Every target within two steps of every piece, on and off the board
+    checks = [
+        (engine, row, col, row + d_row, col + d_col)
+        for engine in positions
+        for player_pieces in engine.pieces
+        for row, col in player_pieces
+        for d_row in range(-2, 3)
+        for d_col in range(-2, 3)
+        if d_row == 0 or d_col == 0
+    ]
+
+    def run():
+        for engine, from_row, from_col, to_row, to_col in checks:
+            engine.is_valid_move(from_row, from_col, to_row, to_col)
+    return run, len(checks)
+
+
+def bench_has_path(positions):
+    pairs = []
+    for engine in positions:
+        cells = [piece for player_pieces in engine.pieces for piece in player_pieces]
+        pairs.extend((engine, cells[i], cells[j]) for i in range(4) for j in range(i + 1, 4))
+
+    def run():
+        for engine, (start_row, start_col), (target_row, target_col) in pairs:
+            engine.has_path(start_row, start_col, target_row, target_col)
+    return run, len(pairs)
+
+
+def bench_check_game_over(positions):
+    def run():
+        for engine in positions:
+            engine.check_game_over()
+    return run, len(positions)
+
+
+def bench_calculate_enclosed_areas(positions):
+    def run():
+        for engine in positions:
+            engine.calculate_enclosed_areas()
+    return run, len(positions)
+
+
+def bench_update_isolated_pieces(positions):
+    def run():
+        for engine in positions:
+            engine.update_isolated_pieces()
+    return run, len(positions)
+
+
+def bench_voronoi(positions):
+    def run():
+        for engine in positions:
+            voronoi(engine)
+    return run, len(positions)
+
+
+def bench_evaluate(positions):
+    def run():
+        for engine in positions:
+            evaluate(engine)
+    return run, len(positions)
+
+
+def bench_end_turn(positions):
+    """end_turn() after a move and wall, for a few legal turns of every position.
+
+    Only end_turn() itself is timed; the move, wall and undo are outside the clock.
+    """
+    turns = []
+    for engine in positions:
+        actions = engine.legal_actions()
+        step = max(1, len(actions) // 8)
+        turns.extend((engine, action) for action in actions[::step])
+
+    def run():
+        elapsed = 0
+        for engine, action in turns:
+            record = engine.move_and_wall(action)
+
+            start = time.perf_counter_ns()
+            engine.end_turn()
+            elapsed += time.perf_counter_ns() - start
+
+            engine.undo_turn(record)
+        return elapsed
+    return run, len(turns)
+
+
+def bench_game(seed_count, board_size=7):
+    """Macro benchmark: complete seeded random games with apply_action()."""
+    def run():
+        for seed in range(seed_count):
+            rng = random.Random(seed)
+            engine = GameEngine(board_size=board_size)
+            random_setup(engine, rng)
+            while engine.phase == "select":
+                actions = engine.legal_actions()
+                if not actions:
+                    break
+                engine.apply_action(actions[rng.randrange(len(actions))])
+    return run, seed_count
+
+
+RULES_BENCHMARKS = {
+    "rules.get_valid_moves": bench_get_valid_moves,
+    "rules.is_valid_move": bench_is_valid_move,
+    "rules.has_path": bench_has_path,
+    "rules.check_game_over": bench_check_game_over,
+    "rules.calculate_enclosed_areas": bench_calculate_enclosed_areas,
+    "rules.update_isolated_pieces": bench_update_isolated_pieces,
+    "rules.end_turn": bench_end_turn,
+    "search.voronoi": bench_voronoi,
+    "search.evaluate": bench_evaluate
+}
+
+
+# Rendering benchmarks
+
+def render_scenarios(position):
+    """Copies of a position in each phase the renderer draws differently."""
+    scenarios = {}
+
+    select = position.clone()
+    scenarios["select"] = select
+
+    move = position.clone()
+    piece_idx = next(i for i in range(2) if not move.isolated_pieces[move.current_player][i])
+    move.stay_option_available = True
+    move.stay_animation_progress = 1.0
+    move.handle_select(*move.pieces[move.current_player][piece_idx])
+    scenarios["move"] = move
+
+    wall = move.clone()
+    wall.handle_move(*wall.valid_moves[-1])
+    scenarios["wall"] = wall
+
+    over = position.clone()
+    rng = random.Random(0)
+    while over.phase == "select":
+        actions = over.legal_actions()
+        if not actions:
+            break
+        over.apply_action(actions[rng.randrange(len(actions))])
+    if over.phase == "game_over":
+        scenarios["game_over"] = over
+    return scenarios
+
+
+# Draw methods and the scenarios they are timed in (every GameRenderer.draw_* method must be listed)
+RENDER_METHODS = {
+    "draw_decorations": None,
+    "draw_board_background": None,
+    "draw_grid": ("select",),
+    "draw_piece": ("select",),
+    "draw_hint": ("select",),
+    "draw_valid_moves": ("move",),
+    "draw_walls": ("select", "wall"),
+    "draw_wall_options": ("wall",),
+    "draw_pieces": ("select", "move"),
+    "draw_stay_option": ("move",),
+    "draw_static_layer": ("select",),
+    "draw_ui": ("select", "move", "wall", "game_over"),
+    "render": ("select", "move", "wall", "game_over")
+}
+
+
+def draw_frames(renderer, draw, frames, *args):
+    # render() starts each frame by taking over the last frame's regions; draw
+    # methods called on their own only add to them, so start every frame empty
+    standalone = draw != renderer.render
+    for _ in range(frames):
+        if standalone:
+            renderer.dirty_rects = []
+        draw(*args)
+
+
+def render_args(method, renderer, state):
+    """Arguments of a draw method in a scenario; most take just the game state."""
+    if method == "draw_piece":
+        row, col = state.pieces[state.current_player][0]
+        return (row, col, renderer.colors["red_player"], False, "Red")
+    if method == "draw_hint":
+        action = state.legal_actions()[0]
+        return (state, AnalysisHint(state.hash, SearchResult(action, 0, 1, [action], 0, 0.0)))
+    return (state,)
+
+
+def render_benchmarks(position, frames):
+    """Return {name: (run, calls)} for every GameRenderer.draw_* method and a full render()."""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    from renderer import GameRenderer
+
+    missing = [name for name in dir(GameRenderer) if name.startswith("draw_") and name not in RENDER_METHODS]
+    if missing:
+        raise RuntimeError(f"No rendering benchmark scenarios for {', '.join(missing)} (add them to RENDER_METHODS)")
+
+    pygame.init()
+    random.seed(0)  # The renderer draws its textures with the global random module
+    renderer = GameRenderer(pygame.Surface((WINDOW_SIZE, WINDOW_SIZE)), WINDOW_SIZE, position.board_size)
+    scenarios = render_scenarios(position)
+
+    benchmarks = {}
+    for method, phases in RENDER_METHODS.items():
+        draw = getattr(renderer, method)
+        if phases is None:
+            benchmarks[f"render.{method}"] = (lambda draw=draw: draw_frames(renderer, draw, frames), frames)
+            continue
+        for phase in phases:
+            if phase not in scenarios:
+                continue
+            args = render_args(method, renderer, scenarios[phase])
+            benchmarks[f"render.{method}[{phase}]"] = (
+                lambda draw=draw, args=args: draw_frames(renderer, draw, frames, *args), frames)
+    return benchmarks
+
+
+def run_benchmarks(samples=200, name_filter=None, render=True, game_count=20, board_size=7):
+    """Run every benchmark (or those whose name contains name_filter) and return the results dict."""
+    positions = benchmark_positions(board_size=board_size)
+    results = {}
+
+    def selected(name):
+        return name_filter is None or name_filter in name
+
+    for name, builder in RULES_BENCHMARKS.items():
+        if not selected(name):
+            continue
+        run, calls = builder(positions)
+        results[name] = measure(run, calls, samples)
+
+    if selected("game.random_games"):
+        run, calls = bench_game(game_count, board_size)
+        results["game.random_games"] = measure(run, calls, max(5, samples // 20), warmup=1)
+
+    if render and any(selected(f"render.{method}") for method in RENDER_METHODS):
+        for name, (run, calls) in render_benchmarks(positions[len(positions) // 2], frames=10).items():
+            if selected(name):
+                results[name] = measure(run, calls, max(10, samples // 4))
+
+    return {
+        "meta": {
+            "unit": "microseconds per call",
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "board_size": board_size,
+            "positions": len(positions),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        "benchmarks": results
+    }
+
+
+def compare(results, baseline, threshold=0.1, stat="p50"):
+    """Compare two result dicts and return a list of (name, old, new, ratio, status) rows.
+
+    status is "slower" or "faster" when the statistic moved by more than the
+    threshold (0.1 is 10%), otherwise "same"; "new" and "missing" mark
+    benchmarks only in one of the two.
+    """
+    rows = []
+    current = results["benchmarks"]
+    previous = baseline["benchmarks"]
+    for name in sorted(set(current) | set(previous)):
+        if name not in previous:
+            rows.append((name, None, current[name][stat], None, "new"))
+            continue
+        if name not in current:
+            rows.append((name, previous[name][stat], None, None, "missing"))
+            continue
+        old = previous[name][stat]
+        new = current[name][stat]
+        ratio = new / old if old else float("inf")
+        if ratio > 1 + threshold:
+            status = "slower"
+        elif ratio < 1 - threshold:
+            status = "faster"
+        else:
+            status = "same"
+        rows.append((name, old, new, ratio, status))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the WallGo rules and renderer.")
+    parser.add_argument("--out", help="write the results as JSON to this file (default: print them)")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change reported as a regression")
+    parser.add_argument("--stat", default="p50", help="statistic used for the comparison")
+    parser.add_argument("--samples", type=int, default=200, help="samples per rules benchmark")
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this")
+    parser.add_argument("--size", type=int, default=7, help="board size of the positions")
+    parser.add_argument("--no-render", action="store_true", help="skip the rendering benchmarks")
+    args = parser.parse_args()
+    if not 2 <= args.size <= MAX_BOARD_SIZE:
+        parser.error(f"--size must be between 2 and {MAX_BOARD_SIZE}")
+
+    results = run_benchmarks(args.samples, args.filter, not args.no_render, board_size=args.size)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows = compare(results, baseline, args.threshold, args.stat)
+        print(f"{'benchmark':<40} {'baseline':>10} {'current':>10} {'ratio':>7}  ({args.stat}, us per call)")
+        for name, old, new, ratio, status in rows:
+            old_text = f"{old:.3f}" if old is not None else "-"
+            new_text = f"{new:.3f}" if new is not None else "-"
+            ratio_text = f"{ratio:.2f}" if ratio is not None else "-"
+            print(f"{name:<40} {old_text:>10} {new_text:>10} {ratio_text:>7}  {status}")
+        if any(row[4] == "slower" for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
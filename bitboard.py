@@ -0,0 +1,201 @@
+"""Packed-integer (bitboard) model of a WallGo board.
+
+Cell (row, col) is stored as bit ``row * size + col`` of a Python int, so a set
+of cells is a single integer and moving every cell of a set one step is a shift.
+"""
+
+# int.bit_count() is only available from Python 3.10
+if hasattr(int, "bit_count"):
+    def popcount(mask):
+        """Count the cells in a mask."""
+        return mask.bit_count()
+else:
+    def popcount(mask):
+        """Count the cells in a mask."""
+        return bin(mask).count("1")
+
+
+class Bitboard:
+    """Walls and piece occupancy of a square board packed into integers.
+
+    Walls are stored per cell rather than per grid line:
+    - h_walls has a bit set for every cell with a wall directly below it
+    - v_walls has a bit set for every cell with a wall directly to its right
+
+    The top and left board edges never need bits because shifting a cell off the
+    top row or the left column already discards it. The bottom and right edges
+    are permanent walls, which also stops shifts from wrapping between rows.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.full = (1 << (size * size)) - 1
+
+        # Masks for the bottom row and right column of the board
+        self.bottom_row = ((1 << size) - 1) << (size * (size - 1))
+        self.right_col = 0
+        for row in range(size):
+            self.right_col |= 1 << (row * size + size - 1)
+
+        # Outer bottom and right edges are permanent walls
+        self.h_walls = self.bottom_row
+        self.v_walls = self.right_col
+
+        # Cells currently holding a piece
+        self.occupied = 0
+
+    @classmethod
+    def from_walls(cls, size, walls):
+        """Build a bitboard from the nested ``GameState.walls`` lists."""
+        board = cls(size)
+        for row in range(size + 1):
+            for col in range(size):
+                if walls[0][row][col]:
+                    board.set_wall(0, row, col)
+        for row in range(size):
+            for col in range(size + 1):
+                if walls[1][row][col]:
+                    board.set_wall(1, row, col)
+        return board
+
+    def copy(self):
+        """Return an independent copy of the board."""
+        other = Bitboard.__new__(Bitboard)
+        other.__dict__.update(self.__dict__)
+        return other
+
+    def bit(self, row, col):
+        """Return the mask of a single cell."""
+        return 1 << (row * self.size + col)
+
+    def cells(self, mask):
+        """Yield (row, col) for every cell in a mask, lowest index first."""
+        while mask:
+            low = mask & -mask
+            index = low.bit_length() - 1
+            yield divmod(index, self.size)
+            mask ^= low
+
+    # Walls use the same coordinates as GameState.walls:
+    # wall_type 0 is walls[0][row][col] (the line above cell (row, col)),
+    # wall_type 1 is walls[1][row][col] (the line left of cell (row, col)).
+
+    def wall_bit(self, wall_type, row, col):
+        """Return (mask, bit) for a wall, or (None, 0) for a top/left board edge."""
+        if wall_type == 0:
+            if row == 0:
+                return None, 0
+            return "h_walls", 1 << ((row - 1) * self.size + col)
+        if col == 0:
+            return None, 0
+        return "v_walls", 1 << (row * self.size + col - 1)
+
+    def set_wall(self, wall_type, row, col):
+        """Add a wall given in GameState.walls coordinates."""
+        name, bit = self.wall_bit(wall_type, row, col)
+        if name is not None:
+            setattr(self, name, getattr(self, name) | bit)
+
+    def clear_wall(self, wall_type, row, col):
+        """Remove a wall given in GameState.walls coordinates."""
+        name, bit = self.wall_bit(wall_type, row, col)
+        if name is not None:
+            setattr(self, name, getattr(self, name) & ~bit)
+
+    def has_wall(self, wall_type, row, col):
+        """Check a wall given in GameState.walls coordinates."""
+        name, bit = self.wall_bit(wall_type, row, col)
+        if name is None:
+            return True  # Top and left board edges
+        return bool(getattr(self, name) & bit)
+
+    def has_wall_between(self, row1, col1, row2, col2):
+        """Check if there's a wall between two adjacent cells."""
+        if row1 == row2:
+            return bool(self.v_walls >> (row1 * self.size + min(col1, col2)) & 1)
+        return bool(self.h_walls >> (min(row1, row2) * self.size + col1) & 1)
+
+    # Shift-based neighbour operations. Each returns the cells that can be
+    # reached from any cell of the mask by one step in that direction.
+
+    def step_north(self, mask):
+        return (mask >> self.size) & ~self.h_walls
+
+    def step_south(self, mask):
+        return (mask & ~self.h_walls) << self.size
+
+    def step_west(self, mask):
+        return (mask >> 1) & ~self.v_walls
+
+    def step_east(self, mask):
+        return (mask & ~self.v_walls) << 1
+
+    def neighbours(self, mask):
+        """Return every cell one unblocked orthogonal step away from the mask."""
+        size = self.size
+        h_walls = self.h_walls
+        v_walls = self.v_walls
+        return (((mask >> size) & ~h_walls) | ((mask & ~h_walls) << size) |
+                ((mask >> 1) & ~v_walls) | ((mask & ~v_walls) << 1))
+
+    def flood(self, seed):
+        """Return the region of cells connected to the seed mask."""
+        region = seed
+        frontier = seed
+        while frontier:
+            frontier = self.neighbours(frontier) & ~region
+            region |= frontier
+        return region
+
+    def label_regions(self):
+        """Label the connected regions of the board in a single pass.
+
+        Returns (labels, sizes): labels[row * size + col] is the region id of a
+        cell and sizes[region_id] is the number of cells in that region.
+        """
+        labels = [0] * (self.size * self.size)
+        sizes = []
+        remaining = self.full
+        while remaining:
+            # Flood from the lowest unlabelled cell
+            region = self.flood(remaining & -remaining)
+            remaining &= ~region
+            region_id = len(sizes)
+            sizes.append(popcount(region))
+            while region:
+                low = region & -region
+                labels[low.bit_length() - 1] = region_id
+                region ^= low
+        return labels, sizes
+
+    def piece_moves(self, row, col):
+        """Return the destinations of a piece as a mask (stay in place excluded).
+
+        A piece moves one or two orthogonal steps, straight or in an L-shape,
+        without passing through walls or occupied cells.
+        """
+        origin = self.bit(row, col)
+        free = ~(self.occupied | origin)
+        one_step = self.neighbours(origin) & free
+        two_step = self.neighbours(one_step) & free
+        return one_step | two_step
+
+    def is_isolated(self, row, col):
+        """Check if a cell is walled in on all four sides."""
+        return not self.neighbours(self.bit(row, col))
+
+    # Piece occupancy
+
+    def place_piece(self, row, col):
+        self.occupied |= self.bit(row, col)
+
+    def move_piece(self, from_row, from_col, to_row, to_col):
+        self.occupied = (self.occupied & ~self.bit(from_row, from_col)) | self.bit(to_row, to_col)
+
+    def set_pieces(self, pieces):
+        """Rebuild the occupancy mask from ``GameState.pieces``."""
+        self.occupied = 0
+        for player_pieces in pieces:
+            for piece in player_pieces:
+                if piece is not None:
+                    self.place_piece(*piece)
@@ -0,0 +1,94 @@
+"""Client for the WallGo server protocol (see server.py).
+
+NetworkClient uses a non-blocking socket that the pygame loop polls once
+per frame, so drawing never waits on the network.
+"""
+
+import socket
+from server import DEFAULT_PORT
+
+
+def parse_address(address):
+    """Split "host:port" (or just "host") into (host, port)."""
+    host, _, port = address.rpartition(":")
+    if not host:
+        return address, DEFAULT_PORT
+    return host, int(port)
+
+
+class NetworkClient:
+    def __init__(self, host, port=DEFAULT_PORT, timeout=5.0):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setblocking(False)
+        self.incoming = b""
+        self.outgoing = b""
+        self.connected = True
+
+        # Match state from the last START message
+        self.player = None
+        self.board_size = None
+        self.first_player = None
+        self.setup = None  # [(row, col)] of Red 1, Red 2, Blue 1, Blue 2
+
+        # Position from the last SNAPSHOT message when watching a match
+        self.snapshot = None  # game_record.pack_snapshot() bytes
+
+    def send(self, line):
+        self.outgoing += line.encode() + b"\n"
+        self.flush()
+
+    def flush(self):
+        while self.outgoing and self.connected:
+            try:
+                sent = self.sock.send(self.outgoing)
+            except BlockingIOError:
+                return
+            except OSError:
+                self.connected = False
+                return
+            self.outgoing = self.outgoing[sent:]
+
+    def join(self, board_size=7):
+        self.player = None
+        self.send(f"JOIN {board_size}")
+
+    def watch(self, match_id):
+        self.player = None
+        self.send(f"WATCH {match_id}")
+
+    def send_move(self, action):
+        self.send(f"MOVE {action}")
+
+    def poll(self):
+        """Return the messages received since the last poll as lists of words."""
+        self.flush()
+        while self.connected:
+            try:
+                data = self.sock.recv(65536)
+            except BlockingIOError:
+                break
+            except OSError:
+                data = b""
+            if not data:
+                self.connected = False
+                break
+            self.incoming += data
+
+        *lines, self.incoming = self.incoming.split(b"\n")
+        messages = []
+        for line in lines:
+            words = line.decode("utf-8", "replace").split()
+            if not words:
+                continue
+            if words[0] == "START":
+                self.player, self.board_size, self.first_player = (int(word) for word in words[1:4])
+                self.setup = [divmod(int(cell), self.board_size) for cell in words[4:8]]
+            elif words[0] == "SNAPSHOT":
+                self.board_size = int(words[2])
+                self.snapshot = bytes.fromhex(words[3])
+            messages.append(words)
+        return messages
+
+    def close(self):
+        self.connected = False
+        self.sock.close()
@@ -0,0 +1,588 @@
+"""WallGo rules engine.
+
+This module has no pygame dependency so that headless tools (bots, simulations,
+servers) can play complete games. game_logic.GameState adds mouse input and the
+pygame clock on top of it.
+"""
+
+import random
+import time
+from array import array
+from bitboard import Bitboard, popcount
+from zobrist import zobrist_keys
+
+
+def monotonic_ms():
+    """Default engine clock: milliseconds from a monotonic timer."""
+    return int(time.monotonic() * 1000)
+
+
+# Sides of a cell used to encode the wall of a turn
+SIDE_TOP = 0
+SIDE_RIGHT = 1
+SIDE_BOTTOM = 2
+SIDE_LEFT = 3
+
+# Largest board whose actions fit in array('H') (2 * size * size * 4 actions)
+MAX_BOARD_SIZE = 90
+
+
+def encode_action(piece, row, col, side, board_size=7):
+    """Encode a complete turn as a small integer.
+
+    A turn is the index of the moved piece (0 or 1), its destination cell and the
+    side of the destination cell that gets the new wall (SIDE_TOP .. SIDE_LEFT):
+    ``((piece * board_size ** 2) + row * board_size + col) * 4 + side``.
+    A 7x7 board needs 392 actions; every board up to 90x90 fits in ``array('H')``.
+    """
+    return ((piece * board_size + row) * board_size + col) * 4 + side
+
+
+def decode_action(action, board_size=7):
+    """Decode an action into (piece, row, col, side)."""
+    cell, side = divmod(action, 4)
+    piece, cell = divmod(cell, board_size * board_size)
+    row, col = divmod(cell, board_size)
+    return piece, row, col, side
+
+
+def wall_for_side(row, col, side):
+    """Return the wall (wall_type, wall_row, wall_col) on one side of a cell."""
+    if side == SIDE_TOP:
+        return 0, row, col
+    if side == SIDE_RIGHT:
+        return 1, row, col + 1
+    if side == SIDE_BOTTOM:
+        return 0, row + 1, col
+    return 1, row, col
+
+
+def side_for_wall(row, col, wall):
+    """Return the side of cell (row, col) that a wall lies on (inverse of wall_for_side)."""
+    wall_type, wall_row, wall_col = wall
+    if wall_type == 0:
+        return SIDE_TOP if wall_row == row else SIDE_BOTTOM
+    return SIDE_LEFT if wall_col == col else SIDE_RIGHT
+
+
+class GameEngine:
+    def __init__(self, clock=None, board_size=7):
+        # Clock used for the "stay in place" delay, returns milliseconds
+        self.clock = clock or monotonic_ms
+        
+        # Board size (7x7 grid by default)
+        if board_size > MAX_BOARD_SIZE:
+            raise ValueError(f"Board size {board_size} is larger than {MAX_BOARD_SIZE}, the most actions can encode")
+        self.board_size = board_size
+        
+        # Initialize the board (None means empty cell)
+        self.board = [[None for _ in range(self.board_size)] for _ in range(self.board_size)]
+        
+        # Initialize walls (horizontal and vertical)
+        # walls[0] = horizontal walls, walls[1] = vertical walls
+        # True means a wall exists
+        self.walls = [
+            [[False for _ in range(self.board_size)] for _ in range(self.board_size + 1)],  # Horizontal walls
+            [[False for _ in range(self.board_size + 1)] for _ in range(self.board_size)]   # Vertical walls
+        ]
+        
+        # Set outer edges as permanent walls
+        for i in range(self.board_size):
+            # Top and bottom edges
+            self.walls[0][0][i] = True
+            self.walls[0][self.board_size][i] = True
+            # Left and right edges
+            self.walls[1][i][0] = True
+            self.walls[1][i][self.board_size] = True
+        
+        # Packed-integer copy of the walls and piece occupancy used by the
+        # move, path and area checks (see bitboard.py)
+        self.bitboard = Bitboard(self.board_size)
+        
+        # Players (0 = Red, 1 = Blue)
+        self.current_player = 0
+        self.player_colors = ["Red", "Blue"]
+        
+        # Pieces (2 per player)
+        # Format: [row, col]
+        # Initialize with None to indicate pieces need to be placed
+        self.pieces = [
+            [None, None],  # Red pieces
+            [None, None]   # Blue pieces
+        ]
+        
+        # Game state
+        self.selected_piece = None
+        self.valid_moves = []
+        self.phase = "setup"  # "setup", "select", "move", "wall", "game_over"
+        self.setup_piece_count = 0  # Track how many pieces have been placed
+        self.winner = None
+        self.message = f"{self.player_colors[self.current_player]}'s turn: Place your first piece"
+        
+        # (player, action) of the last completed turn, from clicks or apply_action()
+        self.last_turn = None
+        
+        # Timing for "stay in place" option
+        self.stay_in_place_timer = 0
+        self.stay_in_place_delay = 1000  # 1 second in milliseconds (reduced from 2000)
+        self.stay_option_available = False
+        self.stay_animation_progress = 0.0  # Animation progress from 0.0 to 1.0
+        
+        # Track isolated pieces (pieces in 1x1 squares)
+        self.isolated_pieces = [
+            [False, False],  # Red pieces
+            [False, False]   # Blue pieces
+        ]
+        
+        # Zobrist key of the position (pieces, walls and side to move),
+        # updated incrementally as pieces move and walls are added
+        self.zobrist = zobrist_keys(self.board_size)
+        self.hash = self.compute_hash()
+        
+        # Debug flag
+        self.debug = False
+    
+    def clone(self):
+        """Return an independent GameEngine copy of the game.
+        
+        The copy uses the default clock and has debug output turned off, so it
+        can be handed to a search or a worker without any UI attached.
+        """
+        other = GameEngine.__new__(GameEngine)
+        other.__dict__.update(self.__dict__)
+        other.clock = monotonic_ms
+        other.debug = False
+        other.board = [list(row) for row in self.board]
+        other.walls = [[list(row) for row in self.walls[0]], [list(row) for row in self.walls[1]]]
+        other.pieces = [list(self.pieces[0]), list(self.pieces[1])]
+        other.isolated_pieces = [list(self.isolated_pieces[0]), list(self.isolated_pieces[1])]
+        other.valid_moves = list(self.valid_moves)
+        other.bitboard = self.bitboard.copy()
+        return other
+    
+    def compute_hash(self):
+        """Compute the Zobrist key of the current position from scratch."""
+        return self.zobrist.hash_position(self.walls, self.pieces, self.current_player)
+    
+    def set_current_player(self, player):
+        """Change the side to move, keeping the position hash in sync."""
+        if player != self.current_player:
+            self.current_player = player
+            self.hash ^= self.zobrist.side
+    
+    def handle_setup(self, row, col):
+        # Check if the cell is already occupied
+        for player_pieces in self.pieces:
+            for piece in player_pieces:
+                if piece is not None and piece == (row, col):
+                    self.message = "This cell is already occupied. Choose another."
+                    return
+        
+        # Determine which player's turn it is (alternating Red/Blue/Red/Blue)
+        player_idx = self.setup_piece_count % 2  # 0 for Red, 1 for Blue
+        
+        # Determine which piece to place (first or second for each player)
+        piece_idx = self.setup_piece_count // 2  # 0 for first piece, 1 for second piece
+        
+        # Place the piece
+        self.pieces[player_idx][piece_idx] = (row, col)
+        self.bitboard.place_piece(row, col)
+        self.hash ^= self.zobrist.piece(player_idx, row, col)
+        self.setup_piece_count += 1
+        
+        # Update message for next piece placement
+        if self.setup_piece_count < 4:
+            next_player = self.setup_piece_count % 2  # Alternate between Red (0) and Blue (1)
+            piece_number = "first" if self.setup_piece_count // 2 == 0 else "second"
+            self.message = f"{self.player_colors[next_player]}'s turn: Place your {piece_number} piece"
+        else:
+            # All pieces placed, start the game
+            self.start_game()
+    
+    def place_pieces(self, positions, first_player=None):
+        """Place all four pieces at once (Red 1, Red 2, Blue 1, Blue 2) and start the game.
+        
+        first_player is 0 (Red) or 1 (Blue), or None to pick one at random.
+        """
+        self.pieces = [
+            [positions[0], positions[1]],  # Red pieces
+            [positions[2], positions[3]]   # Blue pieces
+        ]
+        self.bitboard.set_pieces(self.pieces)
+        self.hash = self.compute_hash()
+        self.setup_piece_count = 4
+        self.start_game(first_player)
+    
+    def start_game(self, first_player=None):
+        # Leave the setup phase
+        self.phase = "select"
+        if first_player is None:
+            first_player = random.randint(0, 1)  # Randomly choose Red (0) or Blue (1) to start
+        self.set_current_player(first_player)
+        self.message = f"{self.player_colors[self.current_player]}'s turn: Select a piece"
+    
+    def handle_select(self, row, col):
+        # Check if the clicked position contains one of the current player's pieces
+        for i, piece in enumerate(self.pieces[self.current_player]):
+            if piece == (row, col):
+                # Check if this piece is isolated (in a 1x1 square)
+                if self.isolated_pieces[self.current_player][i]:
+                    self.message = f"This piece is isolated and cannot be moved."
+                    return
+                
+                self.selected_piece = i
+                self.valid_moves = self.get_valid_moves(piece)
+                self.phase = "move"
+                self.message = f"{self.player_colors[self.current_player]}: Move your piece"
+                
+                # Reset the stay in place timer
+                self.stay_in_place_timer = 0
+                self.stay_option_available = False
+                self.stay_animation_progress = 0.0
+                return
+        
+        self.message = f"{self.player_colors[self.current_player]}: Select your piece"
+    
+    def handle_move(self, row, col):
+        # Check if the clicked position is a valid move
+        if (row, col) in self.valid_moves:
+            # Move the piece (or stay in place if that's the chosen option)
+            self.move_piece(self.current_player, self.selected_piece, row, col)
+            self.phase = "wall"
+            self.message = f"{self.player_colors[self.current_player]}: Place a wall"
+        elif any(piece == (row, col) for piece in self.pieces[self.current_player]):
+            # If player clicked on another of their pieces, select that one instead
+            for i, piece in enumerate(self.pieces[self.current_player]):
+                if piece == (row, col):
+                    self.selected_piece = i
+                    self.valid_moves = self.get_valid_moves(piece)
+                    self.message = f"{self.player_colors[self.current_player]}: Move your piece"
+                    return
+        else:
+            self.message = "Invalid move. Try again."
+    
+    def move_piece(self, player, piece_idx, row, col):
+        """Move a piece, keeping the occupancy mask and position hash in sync."""
+        from_row, from_col = self.pieces[player][piece_idx]
+        self.pieces[player][piece_idx] = (row, col)
+        self.bitboard.move_piece(from_row, from_col, row, col)
+        self.hash ^= self.zobrist.piece(player, from_row, from_col) ^ self.zobrist.piece(player, row, col)
+    
+    def handle_wall(self, wall_type, row, col):
+        """Place the turn's wall (0 = horizontal, 1 = vertical) next to the moved piece and end the turn."""
+        piece_row, piece_col = self.pieces[self.current_player][self.selected_piece]
+        
+        if self.walls[wall_type][row][col]:
+            self.message = "A wall already exists here"
+        elif not self.is_adjacent_to_piece(row, col, "horizontal" if wall_type == 0 else "vertical", piece_row, piece_col):
+            self.message = "Wall must be adjacent to the moved piece"
+        else:
+            self.place_wall(wall_type, row, col)
+            side = side_for_wall(piece_row, piece_col, (wall_type, row, col))
+            self.last_turn = (self.current_player,
+                              encode_action(self.selected_piece, piece_row, piece_col, side, self.board_size))
+            self.end_turn()
+    
+    def place_wall(self, wall_type, row, col):
+        """Add a wall (0 = horizontal, 1 = vertical) to both wall representations."""
+        self.walls[wall_type][row][col] = True
+        self.bitboard.set_wall(wall_type, row, col)
+        self.hash ^= self.zobrist.walls[wall_type][row][col]
+    
+    def is_adjacent_to_piece(self, wall_row, wall_col, wall_type, piece_row, piece_col):
+        """Check if a wall is adjacent to a piece's position."""
+        if wall_type == "horizontal":
+            # For horizontal walls, check if the wall is directly above or below the piece
+            return (wall_row == piece_row and wall_col == piece_col) or \
+                   (wall_row == piece_row + 1 and wall_col == piece_col)
+        else:  # vertical
+            # For vertical walls, check if the wall is directly to the left or right of the piece
+            return (wall_col == piece_col and wall_row == piece_row) or \
+                   (wall_col == piece_col + 1 and wall_row == piece_row)
+    
+    def end_turn(self):
+        # Flood the regions of the pieces once and share them between the game over check and scoring
+        regions = self.piece_regions()
+        
+        # Check if game is over
+        if self.check_game_over(regions):
+            self.phase = "game_over"
+            # Calculate enclosed areas for each piece
+            areas = self.calculate_enclosed_areas(regions)
+            red_area = sum(areas[0])
+            blue_area = sum(areas[1])
+            
+            if self.debug:
+                print(f"Game over! Areas: Red = {areas[0]}, Blue = {areas[1]}")
+            
+            if red_area > blue_area:
+                self.winner = 0  # Red wins
+                self.message = f"Game Over! Red wins with {red_area} squares vs Blue's {blue_area} squares"
+            elif blue_area > red_area:
+                self.winner = 1  # Blue wins
+                self.message = f"Game Over! Blue wins with {blue_area} squares vs Red's {red_area} squares"
+            else:
+                self.winner = -1  # Tie
+                self.message = f"Game Over! It's a tie with {red_area} squares each"
+        else:
+            # Switch to the other player, unless both of their pieces are isolated
+            # and they have no turn to play
+            self.update_isolated_pieces()
+            if not all(self.isolated_pieces[1 - self.current_player]):
+                self.set_current_player(1 - self.current_player)
+            self.selected_piece = None
+            self.valid_moves = []
+            self.phase = "select"
+            self.message = f"{self.player_colors[self.current_player]}'s turn: Select a piece"
+    
+    def legal_actions(self):
+        """Return every legal complete turn for the side to move as an array('H') of actions.
+
+        Each action is a piece that is not isolated, one of its destinations
+        (staying in place included, the UI delay only guards against misclicks)
+        and a free side of the destination cell for the wall.
+        See encode_action() for the encoding.
+        """
+        actions = array("H")
+        if self.phase != "select":
+            return actions
+        
+        board = self.bitboard
+        size = self.board_size
+        
+        # Cells with no wall on each side (SIDE_TOP .. SIDE_LEFT order)
+        free_bottom = board.full & ~board.h_walls
+        free_right = board.full & ~board.v_walls
+        free_sides = (
+            (free_bottom << size) & board.full,
+            free_right,
+            free_bottom,
+            (free_right << 1) & board.full
+        )
+        
+        for piece_idx, (row, col) in enumerate(self.pieces[self.current_player]):
+            if board.is_isolated(row, col):
+                continue
+            destinations = board.piece_moves(row, col) | board.bit(row, col)
+            base = piece_idx * size * size
+            while destinations:
+                low = destinations & -destinations
+                index = low.bit_length() - 1
+                for side in range(4):
+                    if free_sides[side] & low:
+                        actions.append((base + index) * 4 + side)
+                destinations ^= low
+        
+        return actions
+    
+    def is_legal_action(self, action):
+        """Check one action for the side to move without generating legal_actions()."""
+        size = self.board_size
+        if self.phase != "select" or not 0 <= action < 8 * size * size:
+            return False
+        piece_idx, row, col, side = decode_action(action, size)
+        from_row, from_col = self.pieces[self.current_player][piece_idx]
+        board = self.bitboard
+        if board.is_isolated(from_row, from_col):
+            return False
+        if not (board.piece_moves(from_row, from_col) | board.bit(from_row, from_col)) & board.bit(row, col):
+            return False
+        wall_type, wall_row, wall_col = wall_for_side(row, col, side)
+        return not self.walls[wall_type][wall_row][wall_col]
+    
+    def apply_action(self, action):
+        """Play a complete turn given as an action from legal_actions()."""
+        self.apply_turn(action)
+    
+    def apply_turn(self, action):
+        """Play a complete turn and return the record needed to undo it.
+        
+        The record is a tuple holding only what the turn changed: the player
+        and piece that moved, where the piece came from, the wall that was
+        added and the previous message, winner and last turn.
+        """
+        record = self.move_and_wall(action)
+        self.end_turn()
+        return record
+    
+    def move_and_wall(self, action):
+        """Move the piece and place the wall of an action, without end_turn().
+        
+        Returns the same undo record as apply_turn(); finish the turn with
+        end_turn() before undoing it.
+        """
+        player = self.current_player
+        piece_idx, row, col, side = decode_action(action, self.board_size)
+        wall = wall_for_side(row, col, side)
+        record = (player, piece_idx, self.pieces[player][piece_idx], wall, self.message, self.winner,
+                  self.last_turn)
+        
+        self.selected_piece = piece_idx
+        self.move_piece(player, piece_idx, row, col)
+        self.place_wall(*wall)
+        self.last_turn = (player, action)
+        return record
+    
+    def undo_turn(self, record):
+        """Restore the position from before apply_turn() returned this record."""
+        player, piece_idx, (from_row, from_col), (wall_type, wall_row, wall_col), message, winner, last_turn = record
+        
+        self.walls[wall_type][wall_row][wall_col] = False
+        self.bitboard.clear_wall(wall_type, wall_row, wall_col)
+        self.hash ^= self.zobrist.walls[wall_type][wall_row][wall_col]
+        self.move_piece(player, piece_idx, from_row, from_col)
+        
+        self.set_current_player(player)
+        self.phase = "select"
+        self.selected_piece = None
+        self.valid_moves = []
+        self.message = message
+        self.winner = winner
+        self.last_turn = last_turn
+        self.update_isolated_pieces()
+    
+    def update(self):
+        # Update the stay in place timer if needed
+        current_time = self.clock()
+        
+        # If we're in the move phase and have a selected piece
+        if self.phase == "move" and self.selected_piece is not None:
+            # If the timer hasn't been started yet
+            if self.stay_in_place_timer == 0:
+                self.stay_in_place_timer = current_time
+                self.stay_option_available = False
+                self.stay_animation_progress = 0.0
+            # If the delay has passed
+            elif current_time - self.stay_in_place_timer >= self.stay_in_place_delay:
+                self.stay_option_available = True
+                self.stay_animation_progress = 1.0
+            else:
+                # Calculate animation progress (0.0 to 1.0)
+                self.stay_animation_progress = (current_time - self.stay_in_place_timer) / self.stay_in_place_delay
+        else:
+            # Reset the timer if we're not in the move phase
+            self.stay_in_place_timer = 0
+            self.stay_option_available = False
+            self.stay_animation_progress = 0.0
+            
+        # Update isolated pieces status
+        self.update_isolated_pieces()
+    
+    def update_isolated_pieces(self):
+        """Update which pieces are isolated in 1x1 squares."""
+        for player in range(2):
+            for piece_idx in range(2):
+                if self.pieces[player][piece_idx] is not None:
+                    row, col = self.pieces[player][piece_idx]
+                    
+                    # A piece is isolated when there are walls on all four sides
+                    self.isolated_pieces[player][piece_idx] = self.bitboard.is_isolated(row, col)
+    
+    def get_valid_moves(self, piece):
+        row, col = piece
+        valid_moves = []
+        
+        # Add the current position as a valid "move" (stay in place) only if the delay has passed
+        if self.stay_option_available:
+            valid_moves.append((row, col))
+        
+        # One- and two-step moves (straight or L-shaped) as a single destination mask
+        valid_moves.extend(self.bitboard.cells(self.bitboard.piece_moves(row, col)))
+        
+        return valid_moves
+    
+    def is_valid_move(self, from_row, from_col, to_row, to_col):
+        board = self.bitboard
+        
+        # Check if destination is within bounds
+        if not (0 <= to_row < self.board_size and 0 <= to_col < self.board_size):
+            return False
+        
+        # Check if destination is occupied by any piece
+        # (the start cell itself is allowed, this is needed for path checks)
+        if (to_row, to_col) != (from_row, from_col) and board.occupied & board.bit(to_row, to_col):
+            return False
+        
+        # Check if there's a wall between the cells
+        if from_row == to_row:
+            # Horizontal movement
+            for col in range(min(from_col, to_col), max(from_col, to_col)):
+                if board.has_wall_between(from_row, col, from_row, col + 1):
+                    return False
+        elif from_col == to_col:
+            # Vertical movement
+            for row in range(min(from_row, to_row), max(from_row, to_row)):
+                if board.has_wall_between(row, from_col, row + 1, from_col):
+                    return False
+        
+        return True
+    
+    def piece_regions(self):
+        """Return the region (cell mask) of Red 1, Red 2, Blue 1 and Blue 2.
+        
+        Only the regions holding pieces are flooded, and pieces sharing a region
+        share one flood, so the cost does not grow with the number of regions.
+        """
+        board = self.bitboard
+        regions = []
+        for player_pieces in self.pieces:
+            for row, col in player_pieces:
+                cell = board.bit(row, col)
+                for region in regions:
+                    if region & cell:
+                        break
+                else:
+                    region = board.flood(cell)
+                regions.append(region)
+        return regions
+    
+    def check_game_over(self, regions=None):
+        """
+        Check if the game is over.
+        The game is over when all four pieces are isolated from each other:
+        - Red piece 1 cannot reach Red piece 2
+        - Blue piece 1 cannot reach Blue piece 2
+        - No red piece can reach any blue piece
+        That is, all four pieces lie in different regions of the board.
+        regions is an optional piece_regions() result.
+        """
+        regions = regions or self.piece_regions()
+        
+        if len(set(regions)) == 4:
+            # All pieces are isolated from each other
+            return True
+        
+        if self.debug:
+            region_ids = [regions.index(region) for region in regions]
+            print(f"Pieces still share regions: Red = {region_ids[:2]}, Blue = {region_ids[2:]}")
+        return False
+    
+    def has_path(self, start_row, start_col, target_row, target_col):
+        """Check if there's a path between two positions."""
+        board = self.bitboard
+        return bool(board.flood(board.bit(start_row, start_col)) & board.bit(target_row, target_col))
+    
+    def has_wall_between(self, row1, col1, row2, col2):
+        """Check if there's a wall between two adjacent cells."""
+        return self.bitboard.has_wall_between(row1, col1, row2, col2)
+    
+    def calculate_enclosed_areas(self, regions=None):
+        """Calculate the enclosed area for each piece.
+        regions is an optional piece_regions() result.
+        """
+        sizes = [popcount(region) for region in regions or self.piece_regions()]
+        
+        return [
+            [sizes[0], sizes[1]],  # Red pieces
+            [sizes[2], sizes[3]]   # Blue pieces
+        ]
+    
+    def flood_fill(self, row, col, visited):
+        """Perform a flood fill from a given position."""
+        # If the cell is out of bounds or already visited, return
+        if not (0 <= row < self.board_size and 0 <= col < self.board_size) or visited[row][col]:
+            return
+        
+        # Mark every cell of the region as visited
+        for region_row, region_col in self.bitboard.cells(self.bitboard.flood(self.bitboard.bit(row, col))):
+            visited[region_row][region_col] = True
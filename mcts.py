@@ -0,0 +1,313 @@
+"""Monte Carlo Tree Search player.
+
+UCT search with random or heuristic playouts. With more than one worker the
+search uses root parallelism: every worker process grows its own tree from the
+same position with a different seed, and the visit counts of the root actions
+are added up. Workers need nothing but the rules engine, so they start without
+pygame.
+
+Run ``python mcts.py`` to measure playout throughput per core and how it scales
+with the number of workers.
+"""
+
+import argparse
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from engine import GameEngine
+from search import evaluate
+
+# Playout policies
+PLAYOUT_RANDOM = "random"
+PLAYOUT_HEURISTIC = "heuristic"
+
+# Playouts stop after this many turns and are scored by territory share
+MAX_PLAYOUT_TURNS = 200
+
+# Heuristic playouts pick the best of this many random turns
+HEURISTIC_SAMPLES = 4
+
+
+class MCTSNode:
+    __slots__ = ("action", "parent", "player", "children", "untried", "visits", "wins")
+
+    def __init__(self, action, parent, player, actions):
+        self.action = action    # Action that leads here from the parent
+        self.parent = parent
+        self.player = player    # Player who played that action (None at the root)
+        self.children = []
+        self.untried = actions  # Legal actions not expanded yet
+        self.visits = 0
+        self.wins = 0.0         # Sum of rewards for self.player
+
+    def select_child(self, exploration):
+        """Return the child with the highest UCT value."""
+        log_visits = math.log(self.visits)
+        best_child = None
+        best_value = -1.0
+        for child in self.children:
+            value = child.wins / child.visits + exploration * math.sqrt(log_visits / child.visits)
+            if value > best_value:
+                best_value = value
+                best_child = child
+        return best_child
+
+
+class MCTSResult:
+    def __init__(self, best_action, action_stats, playouts, elapsed, workers):
+        self.best_action = best_action    # Most visited root action, None if there is no legal turn
+        self.action_stats = action_stats  # {action: (visits, wins)} summed over all workers
+        self.playouts = playouts
+        self.elapsed = elapsed            # Wall clock seconds
+        self.workers = workers
+
+    @property
+    def playouts_per_second(self):
+        return self.playouts / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def playouts_per_second_per_worker(self):
+        return self.playouts_per_second / self.workers
+
+    def __repr__(self):
+        return (f"MCTSResult(best_action={self.best_action}, playouts={self.playouts}, "
+                f"elapsed={self.elapsed:.3f}, workers={self.workers}, "
+                f"playouts/s={self.playouts_per_second:.0f})")
+
+
+def shuffled_actions(engine, rng):
+    actions = list(engine.legal_actions())
+    rng.shuffle(actions)
+    return actions
+
+
+def choose_playout_action(engine, actions, policy, rng):
+    if policy == PLAYOUT_RANDOM or len(actions) <= 1:
+        return actions[rng.randrange(len(actions))]
+
+    # Heuristic: the best of a few random turns by the static evaluation
+    player = engine.current_player
+    best_action = None
+    best_score = None
+    for _ in range(HEURISTIC_SAMPLES):
+        action = actions[rng.randrange(len(actions))]
+        record = engine.apply_turn(action)
+        score = evaluate(engine)
+        if engine.current_player != player:
+            score = -score
+        engine.undo_turn(record)
+        if best_score is None or score > best_score:
+            best_score = score
+            best_action = action
+    return best_action
+
+
+def playout(engine, policy, rng):
+    """Play the game out from the position and return each player's reward.
+
+    The engine is left in the final position; returns (records, rewards) so
+    the caller can undo the turns.
+    """
+    records = []
+    while engine.phase == "select" and len(records) < MAX_PLAYOUT_TURNS:
+        actions = engine.legal_actions()
+        if not actions:
+            break
+        records.append(engine.apply_turn(choose_playout_action(engine, actions, policy, rng)))
+
+    if engine.phase == "game_over":
+        winner = engine.winner
+    else:
+        # Cut off: the player with the larger share of the regions wins
+        score = evaluate(engine)
+        winner = -1 if score == 0 else engine.current_player if score > 0 else 1 - engine.current_player
+
+    if winner == -1:
+        return records, (0.5, 0.5)
+    return records, (1.0, 0.0) if winner == 0 else (0.0, 1.0)
+
+
+def run_mcts(engine, time_limit=None, iterations=None, exploration=1.4, policy=PLAYOUT_RANDOM, seed=None):
+    """Grow a UCT tree from the position and return (root, playouts).
+
+    Stops after time_limit seconds or the given number of iterations, whichever
+    comes first. The engine is back in its original position afterwards.
+    """
+    rng = random.Random(seed)
+    root = MCTSNode(None, None, None, shuffled_actions(engine, rng) if engine.phase == "select" else [])
+    if not root.untried:
+        return root, 0
+
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+    playouts = 0
+    while True:
+        if iterations is not None and playouts >= iterations:
+            break
+        if deadline is not None and playouts % 16 == 0 and time.perf_counter() >= deadline:
+            break
+
+        node = root
+        path_records = []
+
+        # Selection
+        while not node.untried and node.children:
+            node = node.select_child(exploration)
+            path_records.append(engine.apply_turn(node.action))
+
+        # Expansion
+        if node.untried:
+            action = node.untried.pop()
+            player = engine.current_player
+            path_records.append(engine.apply_turn(action))
+            child_actions = shuffled_actions(engine, rng) if engine.phase == "select" else []
+            child = MCTSNode(action, node, player, child_actions)
+            node.children.append(child)
+            node = child
+
+        # Simulation
+        playout_records, rewards = playout(engine, policy, rng)
+        playouts += 1
+
+        # Restore the root position
+        for record in reversed(playout_records):
+            engine.undo_turn(record)
+        for record in reversed(path_records):
+            engine.undo_turn(record)
+
+        # Backpropagation
+        while node is not None:
+            node.visits += 1
+            if node.player is not None:
+                node.wins += rewards[node.player]
+            node = node.parent
+
+    return root, playouts
+
+
+def root_action_stats(root):
+    return {child.action: (child.visits, child.wins) for child in root.children}
+
+
+def search_worker(engine, time_limit, iterations, exploration, policy, seed):
+    """Process pool entry point: one independent tree, returns its root statistics."""
+    start = time.perf_counter()
+    root, playouts = run_mcts(engine, time_limit, iterations, exploration, policy, seed)
+    return root_action_stats(root), playouts, time.perf_counter() - start
+
+
+class MCTSPlayer:
+    """UCT player, optionally spreading independent trees over worker processes.
+
+    Use close() (or a with block) to shut the worker pool down.
+    """
+
+    def __init__(self, exploration=1.4, policy=PLAYOUT_RANDOM, workers=1, seed=None):
+        self.exploration = exploration
+        self.policy = policy
+        self.workers = workers
+        self.rng = random.Random(seed)
+        self.executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    def search(self, engine, time_limit=1.0, iterations=None):
+        """Search the position and return an MCTSResult.
+
+        iterations is the number of playouts per worker. The engine is not
+        changed; workers get their own copy.
+        """
+        start = time.perf_counter()
+        seeds = [self.rng.getrandbits(32) for _ in range(self.workers)]
+        if self.executor is None:
+            runs = [search_worker(engine, time_limit, iterations, self.exploration, self.policy, seeds[0])]
+        else:
+            snapshot = engine.clone()
+            futures = [
+                self.executor.submit(search_worker, snapshot, time_limit, iterations,
+                                     self.exploration, self.policy, seed)
+                for seed in seeds
+            ]
+            runs = [future.result() for future in futures]
+
+        # Root parallelism: add up the statistics of every tree
+        action_stats = {}
+        playouts = 0
+        for stats, worker_playouts, _ in runs:
+            playouts += worker_playouts
+            for action, (visits, wins) in stats.items():
+                total_visits, total_wins = action_stats.get(action, (0, 0.0))
+                action_stats[action] = (total_visits + visits, total_wins + wins)
+
+        best_action = max(action_stats, key=lambda action: action_stats[action][0]) if action_stats else None
+        return MCTSResult(best_action, action_stats, playouts, time.perf_counter() - start, self.workers)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def random_position(seed, turns=0):
+    """A game with random setup and the given number of random turns played."""
+    rng = random.Random(seed)
+    engine = GameEngine()
+    size = engine.board_size
+    engine.place_pieces(rng.sample([(row, col) for row in range(size) for col in range(size)], 4))
+    for _ in range(turns):
+        actions = engine.legal_actions()
+        if engine.phase != "select" or not actions:
+            break
+        engine.apply_action(actions[rng.randrange(len(actions))])
+    return engine
+
+
+def measure_scaling(engine, worker_counts, seconds, policy=PLAYOUT_RANDOM):
+    """Run a search per worker count and return one report dict per count."""
+    reports = []
+    base_rate = None
+    for workers in worker_counts:
+        with MCTSPlayer(policy=policy, workers=workers, seed=1) as player:
+            # Warm the pool up so process start-up is not measured
+            player.search(engine, iterations=1)
+            result = player.search(engine, time_limit=seconds)
+        rate = result.playouts_per_second
+        if base_rate is None:
+            base_rate = rate / workers
+        reports.append({
+            "workers": workers,
+            "playouts": result.playouts,
+            "seconds": round(result.elapsed, 3),
+            "playouts_per_second": round(rate, 1),
+            "playouts_per_second_per_core": round(result.playouts_per_second_per_worker, 1),
+            "speedup": round(rate / base_rate, 2),
+            "efficiency": round(rate / base_rate / workers, 2)
+        })
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure MCTS playout throughput and scaling across cores.")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}),
+                        help="worker counts to measure")
+    parser.add_argument("--seconds", type=float, default=3.0, help="search time per measurement")
+    parser.add_argument("--policy", choices=(PLAYOUT_RANDOM, PLAYOUT_HEURISTIC), default=PLAYOUT_RANDOM)
+    parser.add_argument("--turns", type=int, default=4, help="random turns played before searching")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    engine = random_position(args.seed, args.turns)
+    print(f"{'workers':>8} {'playouts':>10} {'playouts/s':>12} {'per core':>10} {'speedup':>8} {'efficiency':>10}")
+    for report in measure_scaling(engine, args.workers, args.seconds, args.policy):
+        print(f"{report['workers']:>8} {report['playouts']:>10} {report['playouts_per_second']:>12} "
+              f"{report['playouts_per_second_per_core']:>10} {report['speedup']:>8} {report['efficiency']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""Opening book: statistics of early positions in a memory-mapped file.
+
+The book file is a small header followed by fixed-size records sorted by
+(position key, action):
+
+    key (uint64)  canonical position key, see symmetry.canonical_form()
+    action (uint16)  turn played, in the canonical orientation
+    games (uint32)  games in which the turn was played
+    points (uint32)  result for the player who played it, 2 per win and 1 per tie
+
+OpeningBook maps the file and finds a position with a binary search over the
+records, so opening a book costs nothing and lookups never load the whole
+book into Python objects. Symmetric positions share their records.
+
+Build a book from self-play games:
+    python opening_book.py build --games 5000 --depth 8 --red greedy --blue greedy --out opening_book.bin
+"""
+
+import argparse
+import mmap
+import random
+import struct
+import time
+from engine import GameEngine, MAX_BOARD_SIZE
+from selfplay import PLAYER_TYPES, make_player, random_setup
+from symmetry import canonical_form
+
+FILE_MAGIC = b"WGOB"
+FILE_VERSION = 1
+HEADER = struct.Struct("<4sHHQ")  # magic, version, board size, record count
+RECORD = struct.Struct("<QHII")   # key, action, games, points
+KEY = struct.Struct("<Q")
+
+# Turns of each game that go into the book by default
+DEFAULT_DEPTH = 8
+
+
+class BookMove:
+    def __init__(self, action, games, points):
+        self.action = action  # In the orientation of the position that was looked up
+        self.games = games
+        self.points = points
+
+    @property
+    def score(self):
+        """Average result for the player to move: 1.0 is a win, 0.5 a tie."""
+        return self.points / (2 * self.games) if self.games else 0.0
+
+    def __repr__(self):
+        return f"BookMove(action={self.action}, games={self.games}, score={self.score:.3f})"
+
+
+class OpeningBook:
+    """Read-only view of a book file. Use close() (or a with block) when done."""
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty file
+            self.file.close()
+            raise ValueError(f"{path} is not an opening book")
+        if len(self.data) < HEADER.size:
+            self.close()
+            raise ValueError(f"{path} is not an opening book")
+        magic, version, self.board_size, self.count = HEADER.unpack_from(self.data, 0)
+        if magic != FILE_MAGIC or version != FILE_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not an opening book (version {FILE_VERSION})")
+        if len(self.data) < HEADER.size + self.count * RECORD.size:
+            # Truncated file
+            self.close()
+            raise ValueError(f"{path} is not an opening book")
+
+    def key_at(self, index):
+        return KEY.unpack_from(self.data, HEADER.size + index * RECORD.size)[0]
+
+    def find(self, key):
+        """Return the index of the first record of key, or of the first larger key."""
+        low = 0
+        high = self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def records(self, key):
+        """Return the (action, games, points) records stored for a canonical key."""
+        result = []
+        index = self.find(key)
+        while index < self.count:
+            record_key, action, games, points = RECORD.unpack_from(self.data, HEADER.size + index * RECORD.size)
+            if record_key != key:
+                break
+            result.append((action, games, points))
+            index += 1
+        return result
+
+    def lookup(self, engine):
+        """Return the BookMoves known for the position, best first."""
+        if engine.board_size != self.board_size or engine.phase != "select":
+            return []
+        key, symmetry = canonical_form(engine)
+        back = symmetry.inverse()
+        player = engine.current_player
+        moves = [BookMove(back.action(action, player), games, points) for action, games, points in self.records(key)]
+        moves.sort(key=lambda move: (move.score, move.games), reverse=True)
+        return moves
+
+    def best_action(self, engine, min_games=3):
+        """Return the best-scoring book turn played in at least min_games games, or None."""
+        for move in self.lookup(engine):
+            if move.games >= min_games:
+                return move.action
+        return None
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def collect_statistics(games, red, blue, depth=DEFAULT_DEPTH, seed=None, board_size=7,
+                       node_limit=2000, setups=0, progress=False):
+    """Play self-play games and return {(key, canonical action): [games, points]} for their first turns.
+
+    With setups > 0 the games start from that many seeded setups (and first
+    players) instead of a new random setup per game, so the statistics of
+    each opening position come from many games.
+    """
+    rng = random.Random(seed)
+    players = [
+        make_player(red, rng.getrandbits(32), node_limit),
+        make_player(blue, rng.getrandbits(32), node_limit)
+    ]
+    setup_seeds = [rng.getrandbits(32) for _ in range(setups)]
+    stats = {}
+    for game in range(games):
+        engine = GameEngine(board_size=board_size)
+        random_setup(engine, random.Random(rng.choice(setup_seeds)) if setup_seeds else rng)
+
+        # Remember the opening turns in canonical form, then play the game out
+        opening = []
+        while engine.phase == "select":
+            if not engine.legal_actions():
+                break
+            player = engine.current_player
+            action = players[player].choose(engine)
+            if len(opening) < depth:
+                key, symmetry = canonical_form(engine)
+                opening.append((key, symmetry.action(action, player), player))
+            engine.apply_action(action)
+
+        for key, action, player in opening:
+            entry = stats.setdefault((key, action), [0, 0])
+            entry[0] += 1
+            entry[1] += 2 if engine.winner == player else 1 if engine.winner == -1 else 0
+
+        if progress and (game + 1) % 100 == 0:
+            print(f"{game + 1} games, {len(stats)} records")
+    return stats
+
+
+def write_book(path, stats, board_size=7):
+    """Write statistics from collect_statistics() (or merged ones) as a sorted book file."""
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(FILE_MAGIC, FILE_VERSION, board_size, len(stats)))
+        for (key, action), (games, points) in sorted(stats.items()):
+            f.write(RECORD.pack(key, action, games, points))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect a WallGo opening book.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="build a book from self-play games")
+    build.add_argument("--games", type=int, default=1000)
+    build.add_argument("--depth", type=int, default=DEFAULT_DEPTH, help="turns per game that go into the book")
+    build.add_argument("--red", choices=PLAYER_TYPES, default="greedy")
+    build.add_argument("--blue", choices=PLAYER_TYPES, default="greedy")
+    build.add_argument("--search-nodes", type=int, default=2000, help="node budget per turn for search players")
+    build.add_argument("--size", type=int, default=7, help="board size")
+    build.add_argument("--setups", type=int, default=0,
+                       help="start the games from this many seeded setups (default: a new setup per game)")
+    build.add_argument("--seed", type=int, default=None)
+    build.add_argument("--out", default="opening_book.bin")
+    build.add_argument("--progress", action="store_true")
+
+    info = commands.add_parser("info", help="print a summary of a book")
+    info.add_argument("path")
+
+    args = parser.parse_args()
+    if args.command == "build":
+        if not 2 <= args.size <= MAX_BOARD_SIZE:
+            build.error(f"--size must be between 2 and {MAX_BOARD_SIZE}")
+        start = time.perf_counter()
+        stats = collect_statistics(args.games, args.red, args.blue, args.depth, args.seed, args.size,
+                                   args.search_nodes, args.setups, args.progress)
+        write_book(args.out, stats, args.size)
+        print(f"Wrote {len(stats)} records to {args.out} in {time.perf_counter() - start:.1f}s")
+    else:
+        with OpeningBook(args.path) as book:
+            positions = len({book.key_at(index) for index in range(book.count)})
+            print(f"{args.path}: {book.count} records, {positions} positions, {book.board_size}x{book.board_size} board")
+
+
+if __name__ == "__main__":
+    main()
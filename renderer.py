@@ -1,9 +1,10 @@
 import pygame
 import math
 import random
+from engine import decode_action, wall_for_side
 
 class GameRenderer:
-    def __init__(self, screen, window_size):
+    def __init__(self, screen, window_size, board_size=7):
         self.screen = screen
         self.window_size = window_size
         
@@ -24,7 +25,8 @@ class GameRenderer:
             "board_border": (70, 130, 180),  # Steel Blue
             "button": (70, 130, 180),  # Steel Blue
             "button_hover": (100, 149, 237),  # Cornflower Blue
-            "button_text": (255, 255, 255)  # White
+            "button_text": (255, 255, 255),  # White
+            "hint": (147, 112, 219)  # Medium Purple
         }
         
         # Font
@@ -34,10 +36,12 @@ class GameRenderer:
         self.small_font = pygame.font.SysFont("Arial", 18)
         
         # Calculate cell size based on window size and board size
-        self.board_size = 7  # This should match the game state's board size
+        # (render() follows the board size of the game state it draws)
+        self.board_size = board_size
         self.margin = 80
         self.board_pixel_size = window_size - 2 * self.margin
         self.cell_size = self.board_pixel_size / self.board_size
+        self.wall_width = self.get_wall_width()
         
         # Load and scale background texture
         self.background = pygame.Surface((window_size, window_size))
@@ -64,6 +68,16 @@ class GameRenderer:
         self.wall_animation_duration = 300  # milliseconds
         self.wall_animation_start_time = 0
         
+        # Cached picture of everything that only changes between turns (see draw_static_layer)
+        self.static_layer = None
+        self.static_key = None
+        
+        # Screen regions drawn over the static layer this frame and the last one,
+        # for presenting with pygame.display.update() (see updated_rects)
+        self.dirty_rects = []
+        self.erased_rects = []
+        self.full_update = True
+        
         # Load textures
         self.load_textures()
     
@@ -135,8 +149,9 @@ class GameRenderer:
     
     def create_stone_texture(self):
         # Create a stone-like texture for walls
-        width = int(self.cell_size * 0.2)
-        height = int(self.cell_size)
+        # At least 6x15 pixels so the random stone sizes below stay valid on small cells
+        width = max(6, int(self.cell_size * 0.2))
+        height = max(15, int(self.cell_size))
         texture = pygame.Surface((width, height), pygame.SRCALPHA)
         
         # Base color - dark gray
@@ -217,39 +232,127 @@ class GameRenderer:
     def get_cell_size(self):
         return self.cell_size
     
-    def render(self, game_state):
+    def get_wall_width(self):
+        # 6 pixels on the standard 7x7 board, thinner on boards with small cells
+        return max(2, min(6, int(self.cell_size / 15)))
+    
+    def set_board_size(self, board_size):
+        """Switch to another board size, rebuilding the textures that depend on the cell size."""
+        self.board_size = board_size
+        self.cell_size = self.board_pixel_size / board_size
+        self.wall_width = self.get_wall_width()
+        self.red_marble = self.create_marble_texture((220, 60, 60))
+        self.blue_marble = self.create_marble_texture((65, 105, 225))
+        self.wall_texture = self.create_stone_texture()
+    
+    def render(self, game_state, hint=None):
+        if game_state.board_size != self.board_size:
+            self.set_board_size(game_state.board_size)
+        
         # Update animation time
         self.animation_time = pygame.time.get_ticks() * self.pulse_speed
         
-        # Clear the screen with the background
-        self.screen.fill(self.colors["background"])
-        
-        # Draw decorative elements
-        self.draw_decorations()
+        # Start collecting this frame's regions; last frame's are erased by the layer
+        self.erased_rects, self.dirty_rects = self.dirty_rects, []
         
-        # Draw the board background
-        self.draw_board_background()
-        
-        # Draw the grid
-        self.draw_grid(game_state)
+        # Draw the background, board, grid, walls and pieces from the cached layer
+        self.draw_static_layer(game_state)
         
         # Draw valid moves
         if game_state.phase == "move" and game_state.selected_piece is not None:
             self.draw_valid_moves(game_state)
         
-        # Draw walls
-        self.draw_walls(game_state)
-        
-        # Draw the pieces
-        self.draw_pieces(game_state)
+        # Highlight the lines where the wall can go
+        if game_state.phase == "wall":
+            self.draw_wall_options(game_state)
         
         # Draw the stay option on top of everything else
         if game_state.phase == "move" and game_state.selected_piece is not None:
             self.draw_stay_option(game_state)
         
+        # Draw the analysis hint (a search.AnalysisHint) over the board
+        if hint is not None and hint.action is not None:
+            self.draw_hint(game_state, hint)
+        
         # Draw UI elements
         self.draw_ui(game_state)
     
+    def static_layer_key(self, game_state):
+        # Everything the static layer depends on: it is redrawn when a wall is
+        # added, a piece moves or is selected, or the window or board size changes
+        board = game_state.bitboard
+        selected = game_state.selected_piece if game_state.phase != "game_over" else None
+        return (
+            self.screen.get_size(),
+            game_state.board_size,
+            board.h_walls,
+            board.v_walls,
+            tuple(game_state.pieces[0]),
+            tuple(game_state.pieces[1]),
+            tuple(game_state.isolated_pieces[0]),
+            tuple(game_state.isolated_pieces[1]),
+            game_state.current_player,
+            selected
+        )
+    
+    def draw_static_layer(self, game_state):
+        # Most of the picture only changes between turns, so it is drawn once to
+        # an offscreen surface and each frame starts by copying it back to the
+        # screen where the last frame drew over it.
+        # (The decoration lines look animated but the window surface has no
+        # alpha channel, so they always come out the same.)
+        key = self.static_layer_key(game_state)
+        if key != self.static_key:
+            if self.static_layer is None or self.static_layer.get_size() != self.screen.get_size():
+                self.static_layer = pygame.Surface(self.screen.get_size(), 0, self.screen)
+            
+            # Point the draw methods at the layer while it is redrawn
+            screen, self.screen = self.screen, self.static_layer
+            self.screen.fill(self.colors["background"])
+            self.draw_decorations()
+            self.draw_board_background()
+            self.draw_grid(game_state)
+            self.draw_walls(game_state)
+            self.draw_pieces(game_state)
+            self.screen = screen
+            self.static_key = key
+            self.full_update = True
+        
+        if self.full_update:
+            self.screen.blit(self.static_layer, (0, 0))
+        else:
+            # Only what was drawn over the layer last frame needs erasing
+            for rect in self.erased_rects:
+                self.screen.blit(self.static_layer, rect, rect)
+    
+    def mark_dirty(self, rect):
+        # Record a screen region drawn over the static layer this frame (pygame's
+        # draw functions and blit return the rect they touched)
+        self.dirty_rects.append(rect)
+        return rect
+    
+    def invalidate(self):
+        # Redraw and present the whole screen next frame (e.g. after the window was uncovered)
+        self.full_update = True
+    
+    def updated_rects(self):
+        """Return the screen regions that changed this frame, for pygame.display.update().
+
+        That is everything drawn over the static layer this frame plus what was
+        erased from the last frame, or the whole screen when the layer changed.
+        """
+        if self.full_update:
+            self.full_update = False
+            return [self.screen.get_rect()]
+        # Overlays drawn in the same place on both frames (text, buttons) are listed twice
+        unique = {tuple(rect): rect for rect in self.erased_rects + self.dirty_rects}
+        rects = list(unique.values())
+        
+        # Overlapping regions covering more than the screen (the rules window) cost more than one full update
+        if sum(rect.w * rect.h for rect in rects) >= self.screen.get_width() * self.screen.get_height():
+            return [self.screen.get_rect()]
+        return rects
+    
     def draw_decorations(self):
         # Draw some decorative elements around the board
         # Draw a subtle pattern in the background
@@ -399,11 +502,11 @@ class GameRenderer:
                 # Regular valid move indicator with minimal pulsing
                 pulse = (math.sin(self.animation_time * 1.5) + 1) * 0.05 + 0.95  # Value between 0.95 and 1.05 (very subtle)
                 radius = self.cell_size * 0.2 * pulse
-                pygame.draw.circle(self.screen, self.colors["valid_move"], (center_x, center_y), radius)
+                self.mark_dirty(pygame.draw.circle(self.screen, self.colors["valid_move"], (center_x, center_y), radius))
                 
                 # Draw a subtle shadow
                 shadow_radius = radius * 0.8
-                pygame.draw.circle(self.screen, (0, 0, 0, 30), (center_x + 2, center_y + 2), shadow_radius)
+                self.mark_dirty(pygame.draw.circle(self.screen, (0, 0, 0, 30), (center_x + 2, center_y + 2), shadow_radius))
             
         # Highlight the selected piece's position
         if game_state.selected_piece is not None:
@@ -415,7 +518,7 @@ class GameRenderer:
             pulse = (math.sin(self.animation_time * 1.5) + 1) * 0.05 + 0.95  # Value between 0.95 and 1.05 (very subtle)
             rect_size = self.cell_size * pulse
             
-            pygame.draw.rect(
+            self.mark_dirty(pygame.draw.rect(
                 self.screen,
                 self.colors["selected"],
                 (
@@ -426,7 +529,7 @@ class GameRenderer:
                 ),
                 3,  # Border width
                 5   # Rounded corners
-            )
+            ))
     
     def draw_stay_option(self, game_state):
         # Only draw if we're in move phase and have a selected piece
@@ -450,22 +553,22 @@ class GameRenderer:
             border_color = (0, 0, 0)       # Black border
             
             # Draw the expanding circle with a black border to ensure visibility
-            pygame.draw.circle(
+            self.mark_dirty(pygame.draw.circle(
                 self.screen, 
                 circle_color, 
                 (center_x, center_y), 
                 animation_radius, 
                 0  # Filled circle
-            )
+            ))
             
             # Draw a border around the circle
-            pygame.draw.circle(
+            self.mark_dirty(pygame.draw.circle(
                 self.screen, 
                 border_color, 
                 (center_x, center_y), 
                 animation_radius, 
                 max(2, int(4 * (1 - game_state.stay_animation_progress)))  # Thicker border
-            )
+            ))
             
             # If the animation is complete, show "Stay" text in the center of the token
             if game_state.stay_option_available:
@@ -478,11 +581,11 @@ class GameRenderer:
                     offset_rect = text_rect.copy()
                     offset_rect.x += offset_x
                     offset_rect.y += offset_y
-                    self.screen.blit(stay_text, offset_rect)
+                    self.mark_dirty(self.screen.blit(stay_text, offset_rect))
                 
                 # Draw the main text in a bright color
                 stay_text = self.small_font.render("Stay", True, (255, 255, 0))  # Yellow text
-                self.screen.blit(stay_text, text_rect)
+                self.mark_dirty(self.screen.blit(stay_text, text_rect))
     
     def draw_walls(self, game_state):
         # Draw horizontal walls
@@ -501,11 +604,11 @@ class GameRenderer:
                         (0, 0, 0, 100), 
                         (start_x + shadow_offset, start_y + shadow_offset), 
                         (end_x + shadow_offset, end_y + shadow_offset), 
-                        8
+                        self.wall_width + 2
                     )
                     
                     # Draw the wall
-                    pygame.draw.line(self.screen, self.colors["wall"], (start_x, start_y), (end_x, end_y), 6)
+                    pygame.draw.line(self.screen, self.colors["wall"], (start_x, start_y), (end_x, end_y), self.wall_width)
         
         # Draw vertical walls
         for row in range(game_state.board_size):
@@ -523,13 +626,14 @@ class GameRenderer:
                         (0, 0, 0, 100), 
                         (start_x + shadow_offset, start_y + shadow_offset), 
                         (end_x + shadow_offset, end_y + shadow_offset), 
-                        8
+                        self.wall_width + 2
                     )
                     
                     # Draw the wall
-                    pygame.draw.line(self.screen, self.colors["wall"], (start_x, start_y), (end_x, end_y), 6)
-        
-        # If in wall placement phase, highlight grid lines near the moved piece
+                    pygame.draw.line(self.screen, self.colors["wall"], (start_x, start_y), (end_x, end_y), self.wall_width)
+    
+    def draw_wall_options(self, game_state):
+        # In the wall placement phase, highlight grid lines near the moved piece
         if game_state.phase == "wall":
             piece_row, piece_col = game_state.pieces[game_state.current_player][game_state.selected_piece]
             
@@ -550,16 +654,16 @@ class GameRenderer:
                             alpha = 100 - i * 30
                             color = (100, 200, 255, alpha)
                             width = int(3 * pulse) + i
-                            pygame.draw.line(self.screen, color, (start_x, start_y), (end_x, end_y), width)
+                            self.mark_dirty(pygame.draw.line(self.screen, color, (start_x, start_y), (end_x, end_y), width))
                         
                         # Draw the main line
-                        pygame.draw.line(
+                        self.mark_dirty(pygame.draw.line(
                             self.screen, 
                             (100, 200, 255), 
                             (start_x, start_y), 
                             (end_x, end_y), 
                             3
-                        )
+                        ))
             
             # Highlight vertical walls that can be placed
             for col in [piece_col, piece_col + 1]:
@@ -578,19 +682,19 @@ class GameRenderer:
                             alpha = 100 - i * 30
                             color = (100, 200, 255, alpha)
                             width = int(3 * pulse) + i
-                            pygame.draw.line(self.screen, color, (start_x, start_y), (end_x, end_y), width)
+                            self.mark_dirty(pygame.draw.line(self.screen, color, (start_x, start_y), (end_x, end_y), width))
                         
                         # Draw the main line
-                        pygame.draw.line(
+                        self.mark_dirty(pygame.draw.line(
                             self.screen, 
                             (100, 200, 255), 
                             (start_x, start_y), 
                             (end_x, end_y), 
                             3
-                        )
+                        ))
                         
             # Draw a highlight around the moved piece's position
-            pygame.draw.rect(
+            self.mark_dirty(pygame.draw.rect(
                 self.screen,
                 (255, 200, 0, 128),  # Orange-yellow with transparency
                 (
@@ -601,13 +705,50 @@ class GameRenderer:
                 ),
                 2,  # Border width
                 5   # Rounded corners
-            )
+            ))
+    
+    def draw_hint(self, game_state, hint):
+        piece_idx, row, col, side = decode_action(hint.action, game_state.board_size)
+        color = self.colors["hint"]
+        dest_x = self.margin + col * self.cell_size + self.cell_size / 2
+        dest_y = self.margin + row * self.cell_size + self.cell_size / 2
+        
+        # Before the piece is picked, point from the suggested piece to its destination
+        if game_state.phase == "select":
+            piece_row, piece_col = game_state.pieces[game_state.current_player][piece_idx]
+            piece_x = self.margin + piece_col * self.cell_size + self.cell_size / 2
+            piece_y = self.margin + piece_row * self.cell_size + self.cell_size / 2
+            self.mark_dirty(pygame.draw.circle(self.screen, color, (piece_x, piece_y), self.cell_size * 0.45, 3))
+            if (piece_row, piece_col) != (row, col):
+                self.mark_dirty(pygame.draw.line(self.screen, color, (piece_x, piece_y), (dest_x, dest_y), 3))
+        
+        # Shade the destination cell
+        shade = pygame.Surface((self.cell_size, self.cell_size), pygame.SRCALPHA)
+        pygame.draw.rect(shade, color + (90,), shade.get_rect(), 0, 5)
+        self.mark_dirty(self.screen.blit(shade, (self.margin + col * self.cell_size, self.margin + row * self.cell_size)))
+        self.mark_dirty(pygame.draw.circle(self.screen, color, (dest_x, dest_y), self.cell_size * 0.15))
+        
+        # Draw the suggested wall with a slow pulse
+        wall_type, wall_row, wall_col = wall_for_side(row, col, side)
+        start_x = self.margin + wall_col * self.cell_size
+        start_y = self.margin + wall_row * self.cell_size
+        if wall_type == 0:
+            end_x, end_y = start_x + self.cell_size, start_y
+        else:
+            end_x, end_y = start_x, start_y + self.cell_size
+        width = max(2, int(self.wall_width * (0.8 + 0.2 * math.sin(self.animation_time))))
+        self.mark_dirty(pygame.draw.line(self.screen, color, (start_x, start_y), (end_x, end_y), width))
+        
+        # Search depth and score under the title
+        hint_text = self.small_font.render(f"Hint (depth {hint.depth}): {hint.score_text()}", True, color)
+        hint_rect = hint_text.get_rect(center=(self.window_size / 2, self.margin / 2 + 17))
+        self.mark_dirty(self.screen.blit(hint_text, hint_rect))
     
     def draw_ui(self, game_state):
         # Draw game title
         title_text = self.large_font.render("WallGo", True, self.colors["text"])
         title_rect = title_text.get_rect(center=(self.window_size / 2, self.margin / 2 - 10))
-        self.screen.blit(title_text, title_rect)
+        self.mark_dirty(self.screen.blit(title_text, title_rect))
         
         # Draw the current player indicator (only if not game over)
         if game_state.phase != "game_over":
@@ -628,16 +769,16 @@ class GameRenderer:
             
             # Draw the indicator background with a shadow
             shadow_rect = pygame.Rect(indicator_x + 3, indicator_y + 3, indicator_width, indicator_height)
-            pygame.draw.rect(self.screen, (0, 0, 0, 100), shadow_rect, 0, 10)
+            self.mark_dirty(pygame.draw.rect(self.screen, (0, 0, 0, 100), shadow_rect, 0, 10))
             
             indicator_rect = pygame.Rect(indicator_x, indicator_y, indicator_width, indicator_height)
-            pygame.draw.rect(self.screen, player_color, indicator_rect, 0, 10)
-            pygame.draw.rect(self.screen, (255, 255, 255), indicator_rect, 2, 10)
+            self.mark_dirty(pygame.draw.rect(self.screen, player_color, indicator_rect, 0, 10))
+            self.mark_dirty(pygame.draw.rect(self.screen, (255, 255, 255), indicator_rect, 2, 10))
             
             # Draw the player name and instruction
             player_text = self.font.render(f"{player_name}'s Turn: {instruction_part}", True, (255, 255, 255))
             player_text_rect = player_text.get_rect(center=(indicator_x + indicator_width / 2, indicator_y + indicator_height / 2))
-            self.screen.blit(player_text, player_text_rect)
+            self.mark_dirty(self.screen.blit(player_text, player_text_rect))
         
         # If in setup phase, draw placement instructions
         if game_state.phase == "setup":
@@ -649,14 +790,14 @@ class GameRenderer:
             move_text = "Click on a highlighted cell to move (including current position to stay)"
             move_surface = self.font.render(move_text, True, self.colors["text"])
             move_rect = move_surface.get_rect(center=(self.window_size / 2, self.window_size - self.margin / 2 - 60))
-            self.screen.blit(move_surface, move_rect)
+            self.mark_dirty(self.screen.blit(move_surface, move_rect))
         
         # If in wall phase, draw wall placement instructions
         elif game_state.phase == "wall":
             wall_text = "Click on a highlighted line to place a wall"
             wall_surface = self.font.render(wall_text, True, self.colors["text"])
             wall_rect = wall_surface.get_rect(center=(self.window_size / 2, self.window_size - self.margin / 2 - 60))
-            self.screen.blit(wall_surface, wall_rect)
+            self.mark_dirty(self.screen.blit(wall_surface, wall_rect))
         
         # If game is over, display the winner in the center of the screen
         elif game_state.phase == "game_over":
@@ -709,15 +850,15 @@ class GameRenderer:
             # Draw a shadow
             shadow_rect = winner_box_rect.copy()
             shadow_rect.move_ip(8, 8)
-            pygame.draw.rect(self.screen, (0, 0, 0, 100), shadow_rect, 0, 15)
+            self.mark_dirty(pygame.draw.rect(self.screen, (0, 0, 0, 100), shadow_rect, 0, 15))
             
             # Draw the background
-            pygame.draw.rect(self.screen, color, winner_box_rect, 0, 15)
-            pygame.draw.rect(self.screen, (255, 255, 255), winner_box_rect, 3, 15)
+            self.mark_dirty(pygame.draw.rect(self.screen, color, winner_box_rect, 0, 15))
+            self.mark_dirty(pygame.draw.rect(self.screen, (255, 255, 255), winner_box_rect, 3, 15))
             
             # Draw "Game Over!" text
             game_over_rect = game_over_surface.get_rect(center=(winner_box_rect.centerx, winner_box_rect.centery - 100))
-            self.screen.blit(game_over_surface, game_over_rect)
+            self.mark_dirty(self.screen.blit(game_over_surface, game_over_rect))
             
             # Draw the winner text with a glow effect
             winner_rect = winner_surface.get_rect(center=(winner_box_rect.centerx, winner_box_rect.centery - 60))
@@ -726,18 +867,18 @@ class GameRenderer:
             for i in range(3, 0, -1):
                 glow_rect = winner_rect.copy()
                 glow_rect.move_ip(i, i)
-                self.screen.blit(winner_surface, glow_rect)
+                self.mark_dirty(self.screen.blit(winner_surface, glow_rect))
             
             # Draw the main text
-            self.screen.blit(winner_surface, winner_rect)
+            self.mark_dirty(self.screen.blit(winner_surface, winner_rect))
             
             # Draw the score information
             score_rect = score_surface.get_rect(center=(winner_box_rect.centerx, winner_box_rect.centery - 10))
-            self.screen.blit(score_surface, score_rect)
+            self.mark_dirty(self.screen.blit(score_surface, score_rect))
             
             # Draw "Play Again?" text with more prominence
             play_again_surface = self.large_font.render("Press Restart to Play Again", True, (255, 255, 255))
             play_again_rect = play_again_surface.get_rect(center=(winner_box_rect.centerx, winner_box_rect.centery + 50))
-            self.screen.blit(play_again_surface, play_again_rect)
+            self.mark_dirty(self.screen.blit(play_again_surface, play_again_rect))
             
             # No arrow - removed to avoid strange white line
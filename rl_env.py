@@ -0,0 +1,165 @@
+"""Gym-style reinforcement-learning environment around the rules engine.
+
+    env = WallGoEnv(board_size=7)
+    observation, info = env.reset(seed=1)
+    while True:
+        mask = env.legal_action_mask()
+        observation, reward, terminated, truncated, info = env.step(policy(observation, mask))
+        if terminated:
+            break
+
+Observations are float32 feature planes of shape (PLANE_COUNT, size, size),
+from the point of view of the player to move:
+
+    PLANE_WALL_TOP .. PLANE_WALL_LEFT   1 where the cell has a wall on that side
+                                        (SIDE_TOP .. SIDE_LEFT, the wall sides of
+                                        the action encoding)
+    PLANE_OWN_PIECES                    1 on the cells of the mover's pieces
+    PLANE_OPPONENT_PIECES               1 on the cells of the other player's pieces
+    PLANE_SIDE_TO_MOVE                  all 1 when Blue is to move
+
+The observation is a view of one buffer owned by the environment. step()
+updates it in place (one wall and the pieces) instead of rebuilding it, and
+legal_action_mask() fills a reused bool buffer too. Copy them if you keep
+them past the next step(). Actions use engine.encode_action(), so the mask
+lines up with GameEngine.legal_actions() and batch_env.BatchWallGo.
+"""
+
+import random
+import numpy as np
+from engine import GameEngine, decode_action, wall_for_side, SIDE_TOP, SIDE_RIGHT, SIDE_BOTTOM, SIDE_LEFT
+
+# Observation planes
+PLANE_WALL_TOP = SIDE_TOP
+PLANE_WALL_RIGHT = SIDE_RIGHT
+PLANE_WALL_BOTTOM = SIDE_BOTTOM
+PLANE_WALL_LEFT = SIDE_LEFT
+PLANE_OWN_PIECES = 4
+PLANE_OPPONENT_PIECES = 5
+PLANE_SIDE_TO_MOVE = 6
+PLANE_COUNT = 7
+
+
+def bitboard_array(mask, board_size):
+    """Unpack a cell bitboard into a (size, size) uint8 array."""
+    cells = board_size * board_size
+    data = np.frombuffer(mask.to_bytes((cells + 7) // 8, "little"), dtype=np.uint8)
+    return np.unpackbits(data, bitorder="little")[:cells].reshape(board_size, board_size)
+
+
+def engine_observation(engine, out=None):
+    """Write the observation planes of any GameEngine position into out (allocated if None)."""
+    size = engine.board_size
+    if out is None:
+        out = np.zeros((PLANE_COUNT, size, size), dtype=np.float32)
+    board = engine.bitboard
+
+    # The bitboards hold the bottom and right walls; the top and left walls
+    # are those of the neighbours, plus the board edge
+    bottom = bitboard_array(board.h_walls, size)
+    right = bitboard_array(board.v_walls, size)
+    out[PLANE_WALL_BOTTOM] = bottom
+    out[PLANE_WALL_RIGHT] = right
+    out[PLANE_WALL_TOP, 0, :] = 1
+    out[PLANE_WALL_TOP, 1:, :] = bottom[:-1, :]
+    out[PLANE_WALL_LEFT, :, 0] = 1
+    out[PLANE_WALL_LEFT, :, 1:] = right[:, :-1]
+
+    out[PLANE_OWN_PIECES:] = 0
+    me = engine.current_player
+    for player, plane in ((me, PLANE_OWN_PIECES), (1 - me, PLANE_OPPONENT_PIECES)):
+        for piece in engine.pieces[player]:
+            if piece is not None:
+                out[plane, piece[0], piece[1]] = 1
+    if me == 1:
+        out[PLANE_SIDE_TO_MOVE] = 1
+    return out
+
+
+class WallGoEnv:
+    """One game of WallGo with a gym-style reset()/step() API.
+
+    Rewards are for the player who made the step: 1 for a win, -1 for a
+    loss, 0 for a tie or an unfinished game. The player to move after a
+    step is info["current_player"]; it is the same player again when both
+    opponent pieces are isolated.
+    """
+
+    def __init__(self, board_size=7):
+        self.board_size = board_size
+        self.num_actions = 2 * board_size * board_size * 4
+        self.observation_shape = (PLANE_COUNT, board_size, board_size)
+        self.engine = None
+        self.rng = random.Random()
+        self.planes = np.zeros(self.observation_shape, dtype=np.float32)
+        self.mask = np.zeros(self.num_actions, dtype=bool)
+        self.scratch = np.zeros((board_size, board_size), dtype=np.float32)
+
+    def reset(self, seed=None, engine=None):
+        """Start a game with a random setup (or from a copy of engine); return (observation, info)."""
+        if seed is not None:
+            self.rng.seed(seed)
+        if engine is not None:
+            if engine.board_size != self.board_size:
+                raise ValueError(f"Engine board size {engine.board_size} does not match the env size {self.board_size}")
+            self.engine = engine.clone()
+        else:
+            size = self.board_size
+            self.engine = GameEngine(board_size=size)
+            positions = self.rng.sample([(row, col) for row in range(size) for col in range(size)], 4)
+            self.engine.place_pieces(positions, self.rng.randint(0, 1))
+        engine_observation(self.engine, self.planes)
+        return self.planes, self.info()
+
+    def info(self):
+        return {"current_player": self.engine.current_player, "winner": self.engine.winner}
+
+    def legal_action_mask(self):
+        """Bool array of length num_actions, True for the legal actions of the player to move."""
+        self.mask[:] = False
+        actions = self.engine.legal_actions()
+        if actions:
+            self.mask[np.frombuffer(actions, dtype=np.uint16)] = True
+        return self.mask
+
+    def step(self, action):
+        """Play a turn; return (observation, reward, terminated, truncated, info)."""
+        engine = self.engine
+        action = int(action)
+        if not engine.is_legal_action(action):
+            raise ValueError(f"Illegal action {action}")
+        player = engine.current_player
+        piece_idx, row, col, side = decode_action(action, self.board_size)
+        from_row, from_col = engine.pieces[player][piece_idx]
+        engine.apply_action(action)
+        self.update_planes(player, from_row, from_col, row, col, side)
+
+        reward = 0.0
+        terminated = engine.phase == "game_over"
+        if terminated and engine.winner in (0, 1):
+            reward = 1.0 if engine.winner == player else -1.0
+        return self.planes, reward, terminated, False, self.info()
+
+    def update_planes(self, player, from_row, from_col, row, col, side):
+        """Apply one turn to the observation planes in place."""
+        planes = self.planes
+        size = self.board_size
+
+        # The new wall, seen from both cells it separates
+        planes[side, row, col] = 1
+        wall_type, wall_row, wall_col = wall_for_side(row, col, side)
+        if wall_type == 0 and 0 < wall_row < size:
+            planes[SIDE_BOTTOM if side == SIDE_TOP else SIDE_TOP,
+                   wall_row - 1 if side == SIDE_TOP else wall_row, col] = 1
+        elif wall_type == 1 and 0 < wall_col < size:
+            planes[SIDE_RIGHT if side == SIDE_LEFT else SIDE_LEFT,
+                   row, wall_col - 1 if side == SIDE_LEFT else wall_col] = 1
+
+        # Move the piece, then swap the piece planes if the turn passed
+        planes[PLANE_OWN_PIECES, from_row, from_col] = 0
+        planes[PLANE_OWN_PIECES, row, col] = 1
+        if self.engine.current_player != player:
+            np.copyto(self.scratch, planes[PLANE_OWN_PIECES])
+            np.copyto(planes[PLANE_OWN_PIECES], planes[PLANE_OPPONENT_PIECES])
+            np.copyto(planes[PLANE_OPPONENT_PIECES], self.scratch)
+            planes[PLANE_SIDE_TO_MOVE] = self.engine.current_player
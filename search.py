@@ -0,0 +1,418 @@
+"""Alpha-beta search for computer players.
+
+Negamax with alpha-beta pruning, iterative deepening, a transposition table
+and history move ordering. The search plays turns on a GameEngine with
+apply_turn()/undo_turn(), so give it a clone() of the game being shown.
+"""
+
+import queue
+import threading
+import time
+from array import array
+from bitboard import popcount
+from transposition import TranspositionTable, EXACT, LOWER, UPPER, NO_ACTION
+from territory import voronoi
+
+# Score of a won game, before adding the final margin
+WIN_SCORE = 1000000
+INFINITY = 10 * WIN_SCORE
+
+# Score units per cell of territory, so territory outweighs the mobility bonus
+CELL = 12
+
+# How often (in nodes) the search checks its budget
+CHECK_INTERVAL = 256
+
+# Check interval for background searches on a 7x7 board, small enough to hand
+# the GIL back within a few milliseconds (nodes cost more on larger boards)
+BACKGROUND_CHECK_INTERVAL = 32
+
+
+class SearchAborted(Exception):
+    """Raised inside the search when the time or node budget runs out."""
+
+
+class SearchResult:
+    def __init__(self, best_action, score, depth, pv, nodes, elapsed):
+        self.best_action = best_action  # Action to play, None if there is no legal turn
+        self.score = score              # Score for the side to move at the root
+        self.depth = depth              # Deepest fully searched iteration
+        self.pv = pv                    # Principal variation, starting with best_action
+        self.nodes = nodes
+        self.elapsed = elapsed          # Seconds
+
+    def __repr__(self):
+        return (f"SearchResult(best_action={self.best_action}, score={self.score}, depth={self.depth}, "
+                f"pv={self.pv}, nodes={self.nodes}, elapsed={self.elapsed:.3f})")
+
+
+def final_score(engine):
+    """Score a finished game for the side to move: a win plus the territory margin."""
+    areas = engine.calculate_enclosed_areas()
+    margin = sum(areas[0]) - sum(areas[1])
+    if engine.current_player == 1:
+        margin = -margin
+    if margin > 0:
+        return WIN_SCORE + margin * CELL
+    if margin < 0:
+        return -WIN_SCORE + margin * CELL
+    return 0
+
+
+def evaluate(engine):
+    """Heuristic score of the position for the side to move.
+
+    The cells each player's pieces reach first (see territory.voronoi(), in
+    CELL units) plus a small bonus for the number of cells their pieces can
+    move to.
+    """
+    if engine.phase == "game_over":
+        return final_score(engine)
+
+    board = engine.bitboard
+    counts = voronoi(engine).counts
+    shares = [counts[0] * CELL, counts[1] * CELL]
+    mobility = [0, 0]
+    for player in range(2):
+        for row, col in engine.pieces[player]:
+            mobility[player] += popcount(board.piece_moves(row, col))
+
+    me = engine.current_player
+    return (shares[me] - shares[1 - me]) + (mobility[me] - mobility[1 - me])
+
+
+class AlphaBetaSearch:
+    def __init__(self, tt=None, evaluate=evaluate):
+        self.tt = tt or TranspositionTable(16 * 1024 * 1024)
+        self.evaluate = evaluate
+
+        # Set from another thread to stop the search early (cleared by BackgroundSearch.start)
+        self.stop_event = threading.Event()
+
+        # For searches in a background thread: an Event that is cleared while the
+        # search must not run. The search releases the GIL and waits on it at every check.
+        self.run_gate = None
+        self.check_interval = CHECK_INTERVAL
+
+        self.nodes = 0
+        self.deadline = None
+        self.node_limit = None
+        self.can_abort = False
+        self.history = None
+
+    def search(self, engine, max_depth=64, time_limit=None, node_limit=None, on_iteration=None):
+        """Search the position and return a SearchResult.
+
+        Iterative deepening runs until max_depth, time_limit (seconds) or
+        node_limit is reached; the result of the last finished iteration is
+        returned. on_iteration, if given, is called with a SearchResult after
+        every finished iteration. The first iteration always finishes so there
+        is always a move to play, unless stop_event cancels the search (then
+        the result may have no move and should be discarded).
+        """
+        start = time.perf_counter()
+        self.nodes = 0
+        self.deadline = start + time_limit if time_limit is not None else None
+        self.node_limit = node_limit
+        self.history = array("I", bytes(4 * 8 * engine.board_size * engine.board_size))
+        self.tt.new_search()
+
+        result = SearchResult(None, self.evaluate(engine), 0, [], 0, 0.0)
+        if engine.phase != "select" or not engine.legal_actions():
+            return result
+
+        for depth in range(1, max_depth + 1):
+            self.can_abort = depth > 1
+            try:
+                score = self.negamax(engine, depth, -INFINITY, INFINITY, 0)
+            except SearchAborted:
+                # Every applied turn has been undone on the way out
+                break
+
+            pv = self.principal_variation(engine, depth)
+            result = SearchResult(pv[0] if pv else None, score, depth, pv, self.nodes, time.perf_counter() - start)
+            if on_iteration is not None:
+                on_iteration(result)
+
+            # A decided game needs no deeper search
+            if abs(score) >= WIN_SCORE // 2:
+                break
+
+        result.nodes = self.nodes
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    def check_limits(self):
+        if self.run_gate is not None:
+            time.sleep(0)  # Let a waiting game loop take the GIL
+            self.run_gate.wait()
+        if self.stop_event.is_set():
+            # A cancelled search stops at once, even in its first iteration
+            raise SearchAborted()
+        if not self.can_abort:
+            return
+        if ((self.deadline is not None and time.perf_counter() >= self.deadline) or
+                (self.node_limit is not None and self.nodes >= self.node_limit)):
+            raise SearchAborted()
+
+    def negamax(self, engine, depth, alpha, beta, ply):
+        self.nodes += 1
+        if self.nodes % self.check_interval == 0:
+            self.check_limits()
+
+        if engine.phase == "game_over":
+            # Prefer quicker wins and slower losses
+            score = final_score(engine)
+            return score - ply if score > 0 else score + ply if score < 0 else 0
+        if depth <= 0:
+            return self.evaluate(engine)
+
+        key = engine.hash
+        original_alpha = alpha
+        tt_action = NO_ACTION
+        entry = self.tt.probe(key)
+        if entry is not None:
+            value, bound, entry_depth, tt_action = entry
+            value = self.score_from_tt(value, ply)
+            if ply > 0 and entry_depth >= depth:
+                if bound == EXACT:
+                    return value
+                if bound == LOWER and value >= beta:
+                    return value
+                if bound == UPPER and value <= alpha:
+                    return value
+
+        actions = self.ordered_actions(engine, tt_action)
+        if not actions:
+            return self.evaluate(engine)
+
+        player = engine.current_player
+        best_score = -INFINITY
+        best_action = actions[0]
+        for action in actions:
+            record = engine.apply_turn(action)
+            try:
+                if engine.current_player == player:
+                    # Game over, or the opponent had no turn and we move again
+                    score = self.negamax(engine, depth - 1, alpha, beta, ply + 1)
+                else:
+                    score = -self.negamax(engine, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                engine.undo_turn(record)
+
+            if score > best_score:
+                best_score = score
+                best_action = action
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        self.history[action] += depth * depth
+                        break
+
+        if best_score <= original_alpha:
+            bound = UPPER
+        elif best_score >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self.tt.store(key, self.score_to_tt(best_score, ply), bound, depth, best_action)
+        return best_score
+
+    def ordered_actions(self, engine, tt_action):
+        """Legal actions with the transposition table move first, then by history score."""
+        history = self.history
+        actions = sorted(engine.legal_actions(), key=history.__getitem__, reverse=True)
+        if tt_action != NO_ACTION and tt_action in actions:
+            actions.remove(tt_action)
+            actions.insert(0, tt_action)
+        return actions
+
+    # Win scores depend on the distance from the root, store them relative to the node
+
+    def score_to_tt(self, score, ply):
+        if score >= WIN_SCORE // 2:
+            return score + ply
+        if score <= -WIN_SCORE // 2:
+            return score - ply
+        return score
+
+    def score_from_tt(self, score, ply):
+        if score >= WIN_SCORE // 2:
+            return score - ply
+        if score <= -WIN_SCORE // 2:
+            return score + ply
+        return score
+
+    def principal_variation(self, engine, max_length):
+        """Follow the best moves stored in the transposition table from the position."""
+        pv = []
+        records = []
+        seen = set()
+        while len(pv) < max_length and engine.phase == "select" and engine.hash not in seen:
+            seen.add(engine.hash)
+            entry = self.tt.probe(engine.hash)
+            if entry is None or entry[3] == NO_ACTION or entry[3] not in engine.legal_actions():
+                break
+            pv.append(entry[3])
+            records.append(engine.apply_turn(entry[3]))
+        for record in reversed(records):
+            engine.undo_turn(record)
+        return pv
+
+
+class BackgroundSearch:
+    """Run an AlphaBetaSearch in a daemon thread so the game loop keeps drawing.
+
+    start() takes an engine the search may own (use GameEngine.clone()),
+    poll() returns the SearchResult once it is ready. The search only runs
+    during run_for(), which the game loop calls with the time it has left
+    before the next frame, so drawing never competes with it for the GIL.
+    """
+
+    def __init__(self, search=None):
+        self.search = search or AlphaBetaSearch()
+        self.run_gate = threading.Event()
+        self.search.run_gate = self.run_gate
+        self.search.check_interval = BACKGROUND_CHECK_INTERVAL
+        self.thread = None
+        self.result = None
+        self.position = None
+
+    def start(self, engine, time_limit=2.0, max_depth=64, node_limit=None):
+        self.cancel()
+        self.search.stop_event.clear()
+        self.search.check_interval = max(4, BACKGROUND_CHECK_INTERVAL * 7 // engine.board_size)
+        self.position = engine.hash
+        self.thread = threading.Thread(
+            target=self.run,
+            args=(engine, max_depth, time_limit, node_limit),
+            daemon=True
+        )
+        self.thread.start()
+
+    def run(self, engine, max_depth, time_limit, node_limit):
+        self.result = self.search.search(engine, max_depth=max_depth, time_limit=time_limit, node_limit=node_limit)
+
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def run_for(self, seconds):
+        """Let the search run for a while, then hold it at its next check.
+
+        The search stops within a few milliseconds (BACKGROUND_CHECK_INTERVAL
+        nodes) of the window closing; leave that much slack before the next frame.
+        """
+        if not self.running() or seconds <= 0:
+            return
+        self.run_gate.set()
+        time.sleep(seconds)
+        self.run_gate.clear()
+
+    def poll(self):
+        """Return the finished SearchResult once, or None while still searching."""
+        if self.thread is None or self.thread.is_alive():
+            return None
+        self.thread = None
+        result, self.result = self.result, None
+        return result
+
+    def cancel(self):
+        """Stop a running search and discard its result."""
+        if self.thread is not None:
+            self.search.stop_event.set()
+            self.run_gate.set()
+            self.thread.join()
+            self.run_gate.clear()
+            self.thread = None
+        self.result = None
+
+
+class AnalysisHint:
+    """One finished iteration of a BackgroundAnalysis, for the position with hash position."""
+
+    def __init__(self, position, result):
+        self.position = position
+        self.action = result.best_action
+        self.score = result.score
+        self.depth = result.depth
+        self.nodes = result.nodes
+
+    def score_text(self):
+        """The score for the side to move: a won or lost game, or the territory lead in cells."""
+        if self.score >= WIN_SCORE // 2:
+            return "win"
+        if self.score <= -WIN_SCORE // 2:
+            return "loss"
+        return f"{self.score / CELL:+.1f}"
+
+
+class BackgroundAnalysis(BackgroundSearch):
+    """Search whatever position is on screen, without a time limit, and stream hints.
+
+    analyse() hands the daemon thread a position (it clones it) and the
+    thread restarts iterative deepening there, putting an AnalysisHint on a
+    queue.SimpleQueue after every finished depth. latest() drains the queue
+    without blocking and returns the deepest hint for the position last
+    given. Like BackgroundSearch, the thread only runs during run_for().
+    """
+
+    def __init__(self, search=None, max_depth=64):
+        super().__init__(search)
+        self.max_depth = max_depth
+        self.hints = queue.SimpleQueue()
+        self.hint = None
+        self.pending = None  # Engine waiting for the thread to pick it up
+        self.wakeup = threading.Event()
+        self.stopped = False
+
+    def analyse(self, engine):
+        """Switch the analysis to the position of engine, unless it is already being analysed."""
+        if self.running() and engine.hash == self.position:
+            return
+        self.position = engine.hash
+        self.hint = None
+        self.search.check_interval = max(4, BACKGROUND_CHECK_INTERVAL * 7 // engine.board_size)
+        self.pending = engine.clone()
+        self.search.stop_event.set()
+        self.wakeup.set()
+        if not self.running():
+            self.stopped = False
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while True:
+            self.wakeup.wait()
+            self.wakeup.clear()
+            if self.stopped:
+                return
+            engine, self.pending = self.pending, None
+            if engine is None:
+                continue
+            self.search.stop_event.clear()
+            if self.pending is not None or self.stopped:
+                # Replaced or cancelled before the search started, and the stop request was just cleared
+                self.wakeup.set()
+                continue
+            position = engine.hash
+            self.search.search(engine, self.max_depth,
+                               on_iteration=lambda result: self.hints.put(AnalysisHint(position, result)))
+
+    def latest(self):
+        """Return the newest AnalysisHint for the current position (None before the first depth)."""
+        while True:
+            try:
+                hint = self.hints.get_nowait()
+            except queue.Empty:
+                return self.hint
+            if hint.position == self.position:
+                self.hint = hint
+
+    def cancel(self):
+        """Stop the analysis thread and forget the position."""
+        if self.thread is not None:
+            self.stopped = True
+            self.wakeup.set()
+        super().cancel()
+        self.position = None
+        self.hint = None
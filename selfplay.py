@@ -0,0 +1,282 @@
+"""Headless self-play: play many complete games without a window.
+
+Example:
+    python selfplay.py --games 1000 --red random --blue greedy --seed 1 --out games.bin
+
+Prints games and turns per second and how the time splits between move
+generation, game over checks, scoring, the players choosing their turns and
+adjudication. With --out, every game is written as a compact binary record
+(see game_record.py). With --adjudicate, games stop as soon as the outcome
+can no longer change (see adjudication.py).
+"""
+
+import argparse
+import contextlib
+import random
+import time
+from adjudication import adjudicate
+from engine import GameEngine, MAX_BOARD_SIZE
+from game_record import GameRecordWriter, FLAG_ADJUDICATED, NO_WINNER
+from search import AlphaBetaSearch, evaluate
+
+PLAYER_TYPES = ("random", "greedy", "search")
+
+# Where ProfiledEngine puts the time of a game
+TIMING_BUCKETS = ("move_generation", "game_over_checks", "scoring", "players", "adjudication")
+
+
+class RandomPlayer:
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+
+    def choose(self, engine):
+        actions = engine.legal_actions()
+        return actions[self.rng.randrange(len(actions))]
+
+
+class GreedyPlayer:
+    """Plays the turn with the best static evaluation one turn ahead."""
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+
+    def choose(self, engine):
+        player = engine.current_player
+        best_actions = []
+        best_score = None
+        for action in engine.legal_actions():
+            record = engine.apply_turn(action)
+            score = evaluate(engine)
+            if engine.current_player != player:
+                score = -score
+            engine.undo_turn(record)
+            if best_score is None or score > best_score:
+                best_score = score
+                best_actions = [action]
+            elif score == best_score:
+                best_actions.append(action)
+        return best_actions[self.rng.randrange(len(best_actions))]
+
+
+class SearchPlayer:
+    """Alpha-beta search with a node budget (deterministic) or a time budget.
+
+    With an OpeningBook, positions in the book are answered from it without searching.
+    """
+
+    def __init__(self, node_limit=2000, time_limit=None, max_depth=64, book=None):
+        self.search = AlphaBetaSearch()
+        self.node_limit = node_limit
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.book = book
+
+    def choose(self, engine):
+        if self.book is not None:
+            action = self.book.best_action(engine)
+            if action is not None:
+                return action
+        return self.search.search(engine, max_depth=self.max_depth, time_limit=self.time_limit,
+                                  node_limit=self.node_limit).best_action
+
+
+def make_player(kind, seed=None, node_limit=2000, time_limit=None, book=None):
+    if kind == "random":
+        return RandomPlayer(seed)
+    if kind == "greedy":
+        return GreedyPlayer(seed)
+    if kind == "search":
+        return SearchPlayer(node_limit=node_limit, time_limit=time_limit, book=book)
+    raise ValueError(f"Unknown player type {kind!r}, expected one of {PLAYER_TYPES}")
+
+
+class ProfiledEngine(GameEngine):
+    """GameEngine that adds up where the time of a game goes.
+
+    Only the outermost timed call counts, so a check_game_over() that floods
+    the regions itself is not counted again under piece_regions(), and the
+    legal_actions() calls a player makes while choosing count as player time.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timings = dict.fromkeys(TIMING_BUCKETS, 0.0)
+        self.timing = False
+
+    @contextlib.contextmanager
+    def timed(self, bucket):
+        """Add the time spent in the block to a bucket, unless an outer block is already timed."""
+        if self.timing:
+            yield
+            return
+        self.timing = True
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[bucket] += time.perf_counter() - start
+            self.timing = False
+
+    def legal_actions(self):
+        with self.timed("move_generation"):
+            return super().legal_actions()
+
+    def piece_regions(self):
+        # Flooding the piece regions is what the game over check costs
+        with self.timed("game_over_checks"):
+            return super().piece_regions()
+
+    def check_game_over(self, regions=None):
+        with self.timed("game_over_checks"):
+            return super().check_game_over(regions)
+
+    def calculate_enclosed_areas(self, regions=None):
+        with self.timed("scoring"):
+            return super().calculate_enclosed_areas(regions)
+
+
+def untimed(bucket):
+    return contextlib.nullcontext()
+
+
+def random_setup(engine, rng):
+    """Place the four pieces on random distinct cells and pick the first player, like randomize_pieces()."""
+    size = engine.board_size
+    positions = rng.sample([(row, col) for row in range(size) for col in range(size)], 4)
+    engine.place_pieces(positions, rng.randint(0, 1))
+
+
+def play_game(engine, players, adjudicate_games=False):
+    """Play a set-up game and return (actions played, Adjudication or None).
+
+    With adjudicate_games the game stops as soon as its outcome is decided and
+    the deciding Adjudication is returned; otherwise it is played to the end.
+    """
+    timed = getattr(engine, "timed", untimed)
+    actions = []
+    while engine.phase == "select":
+        if adjudicate_games:
+            with timed("adjudication"):
+                outcome = adjudicate(engine)
+            if outcome.decided:
+                return actions, outcome
+        if not engine.legal_actions():
+            break
+        with timed("players"):
+            action = players[engine.current_player].choose(engine)
+        engine.apply_action(action)
+        actions.append(action)
+    return actions, None
+
+
+def write_record(writer, setup, first_player, engine, actions, outcome=None, metadata=""):
+    """Append one game with its result to a GameRecordWriter.
+
+    outcome is the Adjudication of a game stopped early.
+    """
+    flags = 0
+    if outcome is not None:
+        flags |= FLAG_ADJUDICATED
+        winner = outcome.winner
+        red_area, blue_area = (round(area) for area in outcome.projected)
+    elif engine.phase == "game_over":
+        winner = engine.winner
+        areas = engine.calculate_enclosed_areas()
+        red_area, blue_area = sum(areas[0]), sum(areas[1])
+    else:
+        winner = NO_WINNER
+        red_area = blue_area = 0
+    writer.write_game(setup, first_player, actions, winner, (red_area, blue_area), flags, metadata)
+
+
+def run(games, red, blue, seed=None, out=None, node_limit=2000, time_limit=None, progress=False,
+        adjudicate_games=False, board_size=7, book=None):
+    """Play the games and return a report dict."""
+    rng = random.Random(seed)
+    players = [
+        make_player(red, rng.getrandbits(32), node_limit, time_limit, book),
+        make_player(blue, rng.getrandbits(32), node_limit, time_limit, book)
+    ]
+    timings = dict.fromkeys(TIMING_BUCKETS, 0.0)
+    wins = [0, 0, 0]  # Red, Blue, ties
+    turns = 0
+    adjudicated = 0
+
+    writer = GameRecordWriter(out, board_size) if out else None
+    metadata = f"red={red} blue={blue} seed={seed}"
+    try:
+        start = time.perf_counter()
+        for game in range(games):
+            engine = ProfiledEngine(board_size=board_size)
+            random_setup(engine, rng)
+            setup = [piece for player_pieces in engine.pieces for piece in player_pieces]
+            first_player = engine.current_player
+
+            actions, outcome = play_game(engine, players, adjudicate_games)
+            turns += len(actions)
+            winner = outcome.winner if outcome is not None else engine.winner
+            wins[winner if winner in (0, 1) else 2] += 1
+            if outcome is not None:
+                adjudicated += 1
+            for name, seconds in engine.timings.items():
+                timings[name] += seconds
+            if writer:
+                write_record(writer, setup, first_player, engine, actions, outcome, metadata)
+            if progress and (game + 1) % 100 == 0:
+                print(f"{game + 1} games")
+        elapsed = time.perf_counter() - start
+    finally:
+        if writer:
+            writer.close()
+
+    return {
+        "games": games,
+        "turns": turns,
+        "seconds": elapsed,
+        "games_per_second": games / elapsed if elapsed else 0.0,
+        "turns_per_second": turns / elapsed if elapsed else 0.0,
+        "red_wins": wins[0],
+        "blue_wins": wins[1],
+        "ties": wins[2],
+        "adjudicated": adjudicated,
+        "timings": timings
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play WallGo games headlessly and report throughput.")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--red", choices=PLAYER_TYPES, default="random")
+    parser.add_argument("--blue", choices=PLAYER_TYPES, default="random")
+    parser.add_argument("--size", type=int, default=7, help="board size")
+    parser.add_argument("--seed", type=int, default=None, help="seed for setups and players (random if omitted)")
+    parser.add_argument("--out", help="write game records to this file")
+    parser.add_argument("--search-nodes", type=int, default=2000, help="node budget per turn for search players")
+    parser.add_argument("--search-time", type=float, default=None, help="time budget per turn (seconds) for search players")
+    parser.add_argument("--book", help="opening book file used by search players")
+    parser.add_argument("--adjudicate", action="store_true", help="stop games once the outcome is decided")
+    parser.add_argument("--progress", action="store_true")
+    args = parser.parse_args()
+    if not 2 <= args.size <= MAX_BOARD_SIZE:
+        parser.error(f"--size must be between 2 and {MAX_BOARD_SIZE}")
+
+    book = None
+    if args.book:
+        from opening_book import OpeningBook  # opening_book builds on this module
+        book = OpeningBook(args.book)
+    report = run(args.games, args.red, args.blue, args.seed, args.out,
+                 args.search_nodes, args.search_time, args.progress, args.adjudicate, args.size, book)
+
+    elapsed = report["seconds"]
+    print(f"Games: {report['games']} (Red {report['red_wins']}, Blue {report['blue_wins']}, ties {report['ties']})")
+    print(f"Turns: {report['turns']}")
+    if args.adjudicate:
+        print(f"Adjudicated: {report['adjudicated']} games")
+    print(f"Time: {elapsed:.2f}s, {report['games_per_second']:.1f} games/s, {report['turns_per_second']:.1f} turns/s")
+    for name, seconds in report["timings"].items():
+        share = 100 * seconds / elapsed if elapsed else 0.0
+        print(f"  {name.replace('_', ' ')}: {seconds:.3f}s ({share:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""Asyncio WallGo server hosting many matches at once.
+
+Clients speak a line protocol over TCP: UTF-8 text, one message per line,
+words separated by spaces.
+
+Client to server:
+    JOIN <size>         Queue for a match on a size x size board (default 7)
+    MOVE <action>       Play a complete turn, see engine.encode_action()
+    GAMES               List the running matches
+    WATCH <match id>    Follow a match as a spectator
+
+Server to client:
+    WAIT                Queued, waiting for an opponent
+    START <player> <size> <first player> <cell> <cell> <cell> <cell>
+                        Match started; player is your colour (0 = Red, 1 = Blue)
+                        and the cells (row * size + col) are the setup of
+                        Red 1, Red 2, Blue 1 and Blue 2
+    MOVE <player> <action>
+                        A turn was played, sent to both players
+    END <winner> <red area> <blue area>
+                        Game over; winner is 0, 1 or -1 for a tie
+    LEFT                The opponent disconnected, the match is over
+    GAMES <match id>:<size>:<spectators> ...
+                        The running matches
+    SNAPSHOT <match id> <size> <position>
+                        Sent to a new spectator: the position as hex of
+                        game_record.pack_snapshot(), followed by the same
+                        MOVE, END and LEFT messages the players get
+    ERROR <text>        The last message was rejected
+
+Every match is a single GameEngine (the pygame-free base of
+game_logic.GameState) updated directly by the connection handlers, with no
+task, thread or timer of its own. A turn costs one is_legal_action() check
+and one apply_action(), well under a millisecond even on large boards, so
+one event loop serves thousands of matches. client.NetworkClient is the
+matching client used by wallgo.py --connect.
+
+Spectators only ever get one snapshot, when they start watching; after that
+each turn is a single MOVE line (piece, destination and wall in one
+action number). The line is encoded once per turn and the same bytes are
+written to both players and every spectator. Spectators that stop reading
+are dropped once BUFFER_LIMIT bytes are queued for them; a player that stops
+reading counts as disconnected and the opponent gets LEFT.
+
+Run:
+    python server.py --port 8765 --stats 10
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from engine import GameEngine
+from game_record import pack_snapshot
+
+DEFAULT_PORT = 8765
+MAX_BOARD_SIZE = 50  # Largest board a match may use (below engine.MAX_BOARD_SIZE, to bound the work per match)
+MAX_LINE = 256  # Longest accepted client message in bytes
+BUFFER_LIMIT = 64 * 1024  # Unsent bytes before a player or spectator is dropped
+
+
+class Connection:
+    __slots__ = ("writer", "match", "player", "waiting", "watching")
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.match = None     # Match being played, if any
+        self.player = None    # Colour in the match
+        self.waiting = None   # Board size queued for, if any
+        self.watching = None  # Match followed as a spectator, if any
+
+    def send(self, line):
+        self.write(line.encode() + b"\n")
+
+    def write(self, data):
+        if not self.writer.is_closing():
+            self.writer.write(data)
+
+
+class Match:
+    __slots__ = ("id", "engine", "connections", "spectators", "snapshot")
+
+    def __init__(self, match_id, engine, connections):
+        self.id = match_id
+        self.engine = engine
+        self.connections = connections  # Indexed by player
+        self.spectators = set()
+        self.snapshot = None            # Encoded SNAPSHOT message of the current position
+
+    def snapshot_message(self):
+        """The SNAPSHOT line for new spectators, encoded once per position."""
+        if self.snapshot is None:
+            engine = self.engine
+            self.snapshot = f"SNAPSHOT {self.id} {engine.board_size} {pack_snapshot(engine).hex()}\n".encode()
+        return self.snapshot
+
+    def broadcast(self, line):
+        """Send one line to both players and all spectators, encoding it once.
+
+        Returns a player with more than BUFFER_LIMIT bytes queued, if any; the
+        caller ends the match. Such spectators are dropped here.
+        """
+        data = line.encode() + b"\n"
+        self.snapshot = None
+        stalled = None
+        for connection in self.connections:
+            connection.write(data)
+            if connection.writer.transport.get_write_buffer_size() > BUFFER_LIMIT:
+                stalled = connection
+        slow = []
+        for spectator in self.spectators:
+            spectator.write(data)
+            if spectator.writer.transport.get_write_buffer_size() > BUFFER_LIMIT:
+                slow.append(spectator)
+        for spectator in slow:
+            # Its handler cleans up when the closed connection ends its readline()
+            self.spectators.discard(spectator)
+            spectator.watching = None
+            spectator.writer.close()
+        return stalled
+
+
+class GameServer:
+    """Pairs queued clients and referees their matches."""
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.waiting = {}  # Board size -> queued Connection
+        self.live = {}     # Match id -> running Match
+        self.next_match_id = 1
+        self.connections = 0
+        self.turns = 0
+
+    @property
+    def matches(self):
+        return len(self.live)
+
+    @property
+    def spectators(self):
+        return sum(len(match.spectators) for match in self.live.values())
+
+    async def handle(self, reader, writer):
+        """asyncio.start_server() callback, runs for the lifetime of one client."""
+        connection = Connection(writer)
+        self.connections += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self.dispatch(connection, line)
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            # Dropped connection or a line longer than MAX_LINE
+            pass
+        finally:
+            self.disconnect(connection)
+            writer.close()
+
+    def dispatch(self, connection, line):
+        words = line.decode("utf-8", "replace").split()
+        if not words:
+            return
+        command = words[0].upper()
+        if command == "JOIN":
+            self.join(connection, words[1:])
+        elif command == "MOVE":
+            self.move(connection, words[1:])
+        elif command == "GAMES":
+            connection.send(" ".join(["GAMES"] + [
+                f"{match.id}:{match.engine.board_size}:{len(match.spectators)}" for match in self.live.values()]))
+        elif command == "WATCH":
+            self.watch(connection, words[1:])
+        else:
+            connection.send(f"ERROR unknown command {command}")
+
+    def join(self, connection, args):
+        if connection.match is not None:
+            connection.send("ERROR already in a match")
+            return
+        try:
+            size = int(args[0]) if args else 7
+        except ValueError:
+            size = 0
+        if not 2 <= size <= MAX_BOARD_SIZE:
+            connection.send(f"ERROR board size must be between 2 and {MAX_BOARD_SIZE}")
+            return
+
+        self.leave_queue(connection)
+        self.stop_watching(connection)
+        opponent = self.waiting.pop(size, None)
+        if opponent is None:
+            self.waiting[size] = connection
+            connection.waiting = size
+            connection.send("WAIT")
+        else:
+            opponent.waiting = None
+            self.start_match(size, [opponent, connection])
+
+    def start_match(self, size, connections):
+        # Random colours, setup and first player, like the Randomize button
+        self.rng.shuffle(connections)
+        cells = self.rng.sample(range(size * size), 4)
+        first_player = self.rng.randint(0, 1)
+        engine = GameEngine(board_size=size)
+        engine.place_pieces([divmod(cell, size) for cell in cells], first_player)
+
+        match = Match(self.next_match_id, engine, connections)
+        self.live[match.id] = match
+        self.next_match_id += 1
+        setup = " ".join(str(cell) for cell in cells)
+        for player, connection in enumerate(connections):
+            connection.match = match
+            connection.player = player
+            connection.send(f"START {player} {size} {first_player} {setup}")
+
+    def move(self, connection, args):
+        match = connection.match
+        if match is None:
+            connection.send("ERROR not in a match")
+            return
+        engine = match.engine
+        if engine.current_player != connection.player:
+            connection.send("ERROR not your turn")
+            return
+        try:
+            action = int(args[0])
+        except (IndexError, ValueError):
+            action = -1
+        if not engine.is_legal_action(action):
+            connection.send("ERROR illegal move")
+            return
+
+        engine.apply_action(action)
+        self.turns += 1
+        stalled = match.broadcast(f"MOVE {connection.player} {action}")
+        if stalled is not None:
+            self.drop_player(match, stalled)
+            return
+
+        if engine.phase == "game_over":
+            areas = engine.calculate_enclosed_areas()
+            # The match is over either way, so a player too slow for END is not dropped
+            match.broadcast(f"END {engine.winner} {sum(areas[0])} {sum(areas[1])}")
+            self.end_match(match)
+
+    def watch(self, connection, args):
+        if connection.match is not None:
+            connection.send("ERROR already in a match")
+            return
+        try:
+            match = self.live.get(int(args[0]))
+        except (IndexError, ValueError):
+            match = None
+        if match is None:
+            connection.send("ERROR no such match")
+            return
+        self.leave_queue(connection)
+        self.stop_watching(connection)
+        match.spectators.add(connection)
+        connection.watching = match
+        connection.write(match.snapshot_message())
+
+    def stop_watching(self, connection):
+        if connection.watching is not None:
+            connection.watching.spectators.discard(connection)
+            connection.watching = None
+
+    def end_match(self, match):
+        for connection in match.connections:
+            connection.match = None
+            connection.player = None
+        for spectator in match.spectators:
+            spectator.watching = None
+        match.spectators.clear()
+        del self.live[match.id]
+
+    def drop_player(self, match, connection):
+        """End a match whose player stopped reading, as if that player had disconnected."""
+        # Its handler cleans up when the closed connection ends its readline()
+        connection.writer.close()
+        match.broadcast("LEFT")
+        self.end_match(match)
+
+    def leave_queue(self, connection):
+        if connection.waiting is not None and self.waiting.get(connection.waiting) is connection:
+            del self.waiting[connection.waiting]
+        connection.waiting = None
+
+    def disconnect(self, connection):
+        self.connections -= 1
+        self.leave_queue(connection)
+        self.stop_watching(connection)
+        match = connection.match
+        if match is not None:
+            match.broadcast("LEFT")
+            self.end_match(match)
+
+    async def report(self, interval):
+        """Print the load every interval seconds."""
+        turns = self.turns
+        start = time.perf_counter()
+        while True:
+            await asyncio.sleep(interval)
+            now = time.perf_counter()
+            print(f"{self.connections} connections, {self.matches} matches, {self.spectators} spectators, "
+                  f"{(self.turns - turns) / (now - start):.0f} turns/s")
+            turns = self.turns
+            start = now
+
+
+async def serve(host, port, stats_interval=0, seed=None):
+    server = GameServer(seed)
+    tcp_server = await asyncio.start_server(server.handle, host, port, limit=MAX_LINE)
+    print(f"WallGo server listening on {host}:{port}")
+    if stats_interval > 0:
+        asyncio.ensure_future(server.report(stats_interval))
+    async with tcp_server:
+        await tcp_server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host WallGo matches over TCP.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--stats", type=float, default=0, help="print the load every N seconds")
+    parser.add_argument("--seed", type=int, default=None, help="seed for colours, setups and first players")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.stats, args.seed))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
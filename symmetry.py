@@ -0,0 +1,232 @@
+"""Board symmetries and canonical positions.
+
+The square board has eight symmetries (rotations and reflections), applied
+jointly to the walls and pieces; the rules do not change under any of them.
+The two pieces of a colour are interchangeable too, which Zobrist keys
+already ignore because they key pieces by player and cell, not by index.
+
+canonical_form() picks one representative of the up to eight equivalent
+positions, the orientation with the smallest Zobrist key, and returns that
+key with the Symmetry that maps the position onto it. Caches, books and
+databases keyed by the canonical key store each position once; use
+Symmetry.action() to map moves into the stored orientation and
+Symmetry.inverse() to map them back.
+"""
+
+from bitboard import Bitboard
+from engine import decode_action, encode_action, side_for_wall, wall_for_side
+
+# Symmetry indices
+IDENTITY = 0
+ROTATE_90 = 1        # Clockwise
+ROTATE_180 = 2
+ROTATE_270 = 3
+FLIP_LEFT_RIGHT = 4
+FLIP_UP_DOWN = 5
+TRANSPOSE = 6        # Mirror in the main diagonal
+ANTI_TRANSPOSE = 7   # Mirror in the other diagonal
+SYMMETRY_COUNT = 8
+
+INVERSE = (IDENTITY, ROTATE_270, ROTATE_180, ROTATE_90, FLIP_LEFT_RIGHT, FLIP_UP_DOWN, TRANSPOSE, ANTI_TRANSPOSE)
+
+# Tables shared by every position with the same board size
+_tables = {}
+
+
+def transform_point(index, row, col, last):
+    """Map a point of a grid whose rows and columns run from 0 to last."""
+    if index == IDENTITY:
+        return row, col
+    if index == ROTATE_90:
+        return col, last - row
+    if index == ROTATE_180:
+        return last - row, last - col
+    if index == ROTATE_270:
+        return last - col, row
+    if index == FLIP_LEFT_RIGHT:
+        return row, last - col
+    if index == FLIP_UP_DOWN:
+        return last - row, col
+    if index == TRANSPOSE:
+        return col, row
+    return last - col, last - row
+
+
+def transform_wall(index, wall_type, row, col, board_size):
+    """Map a wall (0 = horizontal, 1 = vertical) as a segment between two grid points."""
+    end = (row, col + 1) if wall_type == 0 else (row + 1, col)
+    row1, col1 = transform_point(index, row, col, board_size)
+    row2, col2 = transform_point(index, end[0], end[1], board_size)
+    if row1 == row2:
+        return 0, row1, min(col1, col2)
+    return 1, min(row1, row2), col1
+
+
+class SymmetryTables:
+    """Cell maps and transformed Zobrist keys of every symmetry for one board size."""
+
+    def __init__(self, zobrist):
+        size = self.board_size = zobrist.board_size
+
+        # cells[index][row * size + col] is the transformed cell index
+        self.cells = [
+            [row * size + col
+             for row, col in (transform_point(index, cell // size, cell % size, size - 1) for cell in range(size * size))]
+            for index in range(SYMMETRY_COUNT)
+        ]
+
+        # Zobrist keys of the transformed elements, laid out like the original tables, so
+        # XORing keys[index] over a position gives the key of the transformed position
+        self.piece_keys = [
+            [[zobrist.pieces[player][cells[cell]] for cell in range(size * size)] for player in range(2)]
+            for cells in self.cells
+        ]
+        self.wall_keys = []
+        for index in range(SYMMETRY_COUNT):
+            walls = [[], []]
+            for wall_type, rows, cols in ((0, size + 1, size), (1, size, size + 1)):
+                for row in range(rows):
+                    walls[wall_type].append([
+                        zobrist.walls[new_type][new_row][new_col]
+                        for new_type, new_row, new_col in (transform_wall(index, wall_type, row, col, size)
+                                                           for col in range(cols))
+                    ])
+            self.wall_keys.append(walls)
+
+
+def symmetry_tables(zobrist):
+    tables = _tables.get(zobrist.board_size)
+    if tables is None:
+        tables = _tables[zobrist.board_size] = SymmetryTables(zobrist)
+    return tables
+
+
+class Symmetry:
+    """A board symmetry plus, per player, whether the piece indices are swapped."""
+
+    __slots__ = ("index", "swaps", "board_size")
+
+    def __init__(self, index=IDENTITY, swaps=(False, False), board_size=7):
+        self.index = index
+        self.swaps = tuple(swaps)
+        self.board_size = board_size
+
+    def cell(self, row, col):
+        return transform_point(self.index, row, col, self.board_size - 1)
+
+    def wall(self, wall_type, row, col):
+        return transform_wall(self.index, wall_type, row, col, self.board_size)
+
+    def piece_index(self, player, piece_idx):
+        return piece_idx ^ self.swaps[player]
+
+    def action(self, action, player):
+        """Map an action of the given player to the transformed position."""
+        size = self.board_size
+        piece_idx, row, col, side = decode_action(action, size)
+        new_row, new_col = self.cell(row, col)
+        wall = self.wall(*wall_for_side(row, col, side))
+        return encode_action(self.piece_index(player, piece_idx), new_row, new_col,
+                             side_for_wall(new_row, new_col, wall), size)
+
+    def inverse(self):
+        """The symmetry that maps the transformed position back."""
+        return Symmetry(INVERSE[self.index], self.swaps, self.board_size)
+
+    def __eq__(self, other):
+        return isinstance(other, Symmetry) and (self.index, self.swaps, self.board_size) == (
+            other.index, other.swaps, other.board_size)
+
+    def __hash__(self):
+        return hash((self.index, self.swaps, self.board_size))
+
+    def __repr__(self):
+        return f"Symmetry(index={self.index}, swaps={self.swaps}, board_size={self.board_size})"
+
+
+def symmetric_keys(engine):
+    """Return the Zobrist key of the position under each of the eight symmetries."""
+    tables = symmetry_tables(engine.zobrist)
+    walls = [(wall_type, row, col)
+             for wall_type in range(2)
+             for row, wall_row in enumerate(engine.walls[wall_type])
+             for col, present in enumerate(wall_row) if present]
+    size = engine.board_size
+    pieces = []
+    for player in range(2):
+        for piece in engine.pieces[player]:
+            if piece is not None:
+                pieces.append((player, piece[0] * size + piece[1]))
+    side = engine.zobrist.side if engine.current_player == 1 else 0
+
+    keys = []
+    for index in range(SYMMETRY_COUNT):
+        wall_keys = tables.wall_keys[index]
+        piece_keys = tables.piece_keys[index]
+        key = side
+        for wall_type, row, col in walls:
+            key ^= wall_keys[wall_type][row][col]
+        for player, cell in pieces:
+            key ^= piece_keys[player][cell]
+        keys.append(key)
+    return keys
+
+
+def canonical_form(engine):
+    """Return (canonical key, Symmetry) for a position.
+
+    The canonical key is the Zobrist key of the orientation with the smallest
+    key (the lowest symmetry index wins ties). The Symmetry maps the position,
+    its pieces and its actions onto that orientation, with the pieces of each
+    colour ordered by cell.
+    """
+    keys = symmetric_keys(engine)
+    key = min(keys)
+    index = keys.index(key)
+    size = engine.board_size
+
+    swaps = []
+    for player_pieces in engine.pieces:
+        if None in player_pieces:
+            swaps.append(False)
+            continue
+        first, second = (transform_point(index, row, col, size - 1) for row, col in player_pieces)
+        swaps.append(first > second)
+    return key, Symmetry(index, swaps, size)
+
+
+def canonical_key(engine):
+    """Return the key shared by every symmetric variant of the position."""
+    return min(symmetric_keys(engine))
+
+
+def transform_engine(engine, symmetry):
+    """Return a copy of the game with the symmetry applied to walls, pieces and selection."""
+    size = engine.board_size
+    other = engine.clone()
+
+    walls = [
+        [[False] * size for _ in range(size + 1)],
+        [[False] * (size + 1) for _ in range(size)]
+    ]
+    for wall_type in range(2):
+        for row, wall_row in enumerate(engine.walls[wall_type]):
+            for col, present in enumerate(wall_row):
+                if present:
+                    new_type, new_row, new_col = symmetry.wall(wall_type, row, col)
+                    walls[new_type][new_row][new_col] = True
+    other.walls = walls
+    other.bitboard = Bitboard.from_walls(size, walls)
+
+    for player in range(2):
+        for piece_idx, piece in enumerate(engine.pieces[player]):
+            other.pieces[player][symmetry.piece_index(player, piece_idx)] = (
+                symmetry.cell(*piece) if piece is not None else None)
+    other.bitboard.set_pieces(other.pieces)
+
+    if engine.selected_piece is not None:
+        other.selected_piece = symmetry.piece_index(engine.current_player, engine.selected_piece)
+    other.valid_moves = [symmetry.cell(row, col) for row, col in engine.valid_moves]
+    other.hash = other.compute_hash()
+    other.update_isolated_pieces()
+    return other
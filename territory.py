@@ -0,0 +1,148 @@
+"""Territory estimate: which player's pieces reach each cell first (Voronoi).
+
+A multi-source breadth-first search runs from both pieces of each player at
+once. One level of the search is one turn under the move rules of
+Bitboard.piece_moves(): one or two orthogonal steps, straight or L-shaped,
+not through walls or the other player's pieces. A cell belongs to the
+player who reaches it in fewer turns; cells reached by both in the same
+number of turns, and cells neither can reach, belong to nobody. A region
+sealed around one player's pieces therefore counts fully for that player.
+
+voronoi() works on the bitboards of one GameEngine and is cheap enough for
+every leaf of a search (see search.evaluate()). batch_voronoi() runs the same
+search for every game of a batch_env.BatchWallGo with NumPy.
+"""
+
+from bitboard import popcount
+
+# Distance of a cell that a player cannot reach
+UNREACHABLE = -1
+
+
+class Territory:
+    def __init__(self, owned, neutral, distances=None):
+        self.owned = owned          # [Red mask, Blue mask] of cells each player reaches first
+        self.neutral = neutral      # Mask of cells both reach in the same number of turns
+        self.distances = distances  # [Red, Blue] lists of turns per cell index (UNREACHABLE), if requested
+
+    @property
+    def counts(self):
+        """(Red cells, Blue cells)."""
+        return popcount(self.owned[0]), popcount(self.owned[1])
+
+    def __repr__(self):
+        return f"Territory(counts={self.counts}, neutral={popcount(self.neutral)})"
+
+
+def voronoi(engine, distances=False):
+    """Return the Territory of a position; with distances=True also the per-player distance maps."""
+    board = engine.bitboard
+    size = board.size
+    full = board.full
+    h_open = ~board.h_walls
+    v_open = ~board.v_walls
+    red = blue = 0
+    for row, col in engine.pieces[0]:
+        red |= 1 << (row * size + col)
+    for row, col in engine.pieces[1]:
+        blue |= 1 << (row * size + col)
+
+    # Each player moves through empty cells and their own pieces
+    red_free = full & ~blue
+    blue_free = full & ~red
+    red_seen = red_frontier = red_owned = red
+    blue_seen = blue_frontier = blue_owned = blue
+    claimed = red | blue
+    neutral = 0
+    maps = None
+    if distances:
+        maps = [[UNREACHABLE] * (size * size) for _ in range(2)]
+        for player, sources in enumerate((red, blue)):
+            for cell in iter_bits(sources):
+                maps[player][cell] = 0
+
+    turns = 0
+    while red_frontier or blue_frontier:
+        turns += 1
+        # One turn of moves for each player, as in Bitboard.piece_moves() (the
+        # neighbours() shifts are inlined, this runs at every search leaf)
+        if red_frontier:
+            mask = red_frontier
+            one_step = (((mask >> size) & h_open) | ((mask & h_open) << size) |
+                        ((mask >> 1) & v_open) | ((mask & v_open) << 1)) & red_free
+            mask = one_step
+            red_frontier = (one_step | ((((mask >> size) & h_open) | ((mask & h_open) << size) |
+                                         ((mask >> 1) & v_open) | ((mask & v_open) << 1)) & red_free)) & ~red_seen
+            red_seen |= red_frontier
+        if blue_frontier:
+            mask = blue_frontier
+            one_step = (((mask >> size) & h_open) | ((mask & h_open) << size) |
+                        ((mask >> 1) & v_open) | ((mask & v_open) << 1)) & blue_free
+            mask = one_step
+            blue_frontier = (one_step | ((((mask >> size) & h_open) | ((mask & h_open) << size) |
+                                          ((mask >> 1) & v_open) | ((mask & v_open) << 1)) & blue_free)) & ~blue_seen
+            blue_seen |= blue_frontier
+        if maps is not None:
+            for player, reached in enumerate((red_frontier, blue_frontier)):
+                for cell in iter_bits(reached):
+                    maps[player][cell] = turns
+
+        red_new = red_frontier & ~claimed
+        blue_new = blue_frontier & ~claimed
+        tie = red_new & blue_new
+        red_owned |= red_new & ~tie
+        blue_owned |= blue_new & ~tie
+        neutral |= tie
+        claimed |= red_new | blue_new
+
+    return Territory([red_owned, blue_owned], neutral, maps)
+
+
+def iter_bits(mask):
+    """Yield the index of every set bit of a mask."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def batch_voronoi(batch, games=slice(None)):
+    """Run the territory search for games of a BatchWallGo.
+
+    Returns (counts, distances): counts is an (n, 2) int array of the cells
+    Red and Blue reach first, distances an (n, 2, size, size) int array of
+    turns per player and cell (UNREACHABLE where a player cannot go).
+    """
+    import numpy as np  # Only the batch version needs NumPy, search.py imports this module too
+
+    sides = batch.open_sides(games)
+    pieces = batch.pieces[games]
+    count = pieces.shape[0]
+    size = batch.board_size
+    game_index = np.repeat(np.arange(count), 2)
+
+    distances = np.full((count, 2, size, size), UNREACHABLE, dtype=np.int32)
+    sources = np.zeros((count, 2, size, size), dtype=bool)
+    for player in range(2):
+        slots = pieces[:, 2 * player:2 * player + 2]
+        sources[game_index, player, slots[:, :, 0].ravel(), slots[:, :, 1].ravel()] = True
+
+    for player in range(2):
+        free = ~sources[:, 1 - player]
+        seen = sources[:, player].copy()
+        frontier = seen.copy()
+        distances[:, player][seen] = 0
+        turns = 0
+        while frontier.any():
+            turns += 1
+            one_step = batch.neighbours(frontier, sides) & free
+            frontier = (one_step | (batch.neighbours(one_step, sides) & free)) & ~seen
+            seen |= frontier
+            distances[:, player][frontier] = turns
+
+    red = distances[:, 0]
+    blue = distances[:, 1]
+    red_first = (red != UNREACHABLE) & ((blue == UNREACHABLE) | (red < blue))
+    blue_first = (blue != UNREACHABLE) & ((red == UNREACHABLE) | (blue < red))
+    counts = np.stack([red_first.sum(axis=(1, 2)), blue_first.sum(axis=(1, 2))], axis=1)
+    return counts, distances
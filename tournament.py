@@ -0,0 +1,284 @@
+"""Round-robin tournaments between computer players on all cores.
+
+Example:
+    python tournament.py greedy search:2000 search:0.1s --games 200 --workers 8
+    python tournament.py search:4000 search:2000 --games 5000 --sprt 0 20
+
+Players are selfplay.py player types; search players take a node budget
+(search:4000) or a time budget per turn (search:0.1s). Every pairing plays
+game pairs: one seeded setup and first player, played once with each
+player as Red, so colour and setup luck cancel out.
+
+Game pairs run in a process pool. Each worker keeps its players between
+games and clears their state at the start of every game. Results are
+added to the standings as soon as a pair finishes, and only a few pairs per
+worker are queued at a time. With --sprt the match stops once the
+sequential probability ratio test decides between the two Elo hypotheses.
+"""
+
+import argparse
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from engine import GameEngine, MAX_BOARD_SIZE
+from selfplay import PLAYER_TYPES, make_player, random_setup, play_game
+
+# Pairs queued per worker; enough to keep workers busy, few enough to stop quickly
+QUEUE_DEPTH = 4
+
+# Per worker process: player spec -> player, reused across games
+_players = {}
+
+
+def parse_player(spec):
+    """Split a player spec into (kind, node_limit, time_limit).
+
+    "search:4000" is a node budget per turn, "search:0.1s" a time budget.
+    """
+    kind, _, budget = spec.partition(":")
+    if kind not in PLAYER_TYPES:
+        raise ValueError(f"Unknown player type {kind!r}, expected one of {PLAYER_TYPES}")
+    node_limit = 2000
+    time_limit = None
+    if budget.endswith("s"):
+        time_limit = float(budget[:-1])
+        node_limit = None
+    elif budget:
+        node_limit = int(budget)
+    return kind, node_limit, time_limit
+
+
+def worker_player(spec, seed):
+    """The player for a spec in this worker, reset for a new game."""
+    player = _players.get(spec)
+    if player is None:
+        kind, node_limit, time_limit = parse_player(spec)
+        player = _players[spec] = make_player(kind, seed, node_limit, time_limit)
+    if hasattr(player, "rng"):
+        player.rng.seed(seed)
+    if hasattr(player, "search"):
+        # A node-budget search only replays the same game if it starts from an empty table
+        player.search.tt.clear()
+    return player
+
+
+def play_pair(first_spec, second_spec, seed, board_size=7, adjudicate_games=False):
+    """Play one setup twice with the players swapping colours.
+
+    Returns (scores of the first player, turns played), a score being 1 for
+    a win, 0.5 for a tie and 0 for a loss.
+    """
+    rng = random.Random(seed)
+    setup_seed = rng.getrandbits(32)
+    scores = []
+    turns = 0
+    for first_colour in (0, 1):
+        specs = (first_spec, second_spec) if first_colour == 0 else (second_spec, first_spec)
+        players = [worker_player(spec, rng.getrandbits(32)) for spec in specs]
+        engine = GameEngine(board_size=board_size)
+        random_setup(engine, random.Random(setup_seed))
+        actions, outcome = play_game(engine, players, adjudicate_games)
+        turns += len(actions)
+        winner = outcome.winner if outcome is not None else engine.winner
+        scores.append(1.0 if winner == first_colour else 0.5 if winner not in (0, 1) else 0.0)
+    return scores, turns
+
+
+def elo_from_score(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+
+def score_from_elo(elo):
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def elo_interval(wins, draws, losses, z=1.96):
+    """Return (Elo difference, margin) of a win/draw/loss record, margin at confidence z."""
+    games = wins + draws + losses
+    if not games:
+        return 0.0, float("inf")
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    if variance <= 0:
+        # Every game had the same result
+        return elo_from_score(score), float("inf")
+    deviation = z * math.sqrt(variance / games)
+    return elo_from_score(score), (elo_from_score(score + deviation) - elo_from_score(score - deviation)) / 2
+
+
+def sprt_llr(wins, draws, losses, elo0, elo1):
+    """Log-likelihood ratio of H1 (Elo difference elo1) against H0 (elo0).
+
+    Uses the normal approximation of the generalised SPRT: the score
+    variance is estimated from the games played so far, plus half a win and
+    half a loss so that a one-sided record does not decide the test after a
+    handful of games.
+    """
+    if not wins + draws + losses:
+        return 0.0
+    wins += 0.5
+    losses += 0.5
+    games = wins + draws + losses
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    if variance <= 0:
+        return 0.0
+    score0 = score_from_elo(elo0)
+    score1 = score_from_elo(elo1)
+    return (score1 - score0) * (2 * score - score0 - score1) * games / (2 * variance)
+
+
+def sprt_bounds(alpha, beta):
+    """The (lower, upper) LLR bounds that accept H0 and H1."""
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+
+class Standings:
+    """Win/draw/loss counts per pairing and per player, updated as results stream in."""
+
+    def __init__(self, players):
+        self.players = players
+        self.pairs = {}                                   # (first, second) -> [wins, draws, losses]
+        self.totals = {player: [0, 0, 0] for player in players}
+        self.games = 0
+        self.turns = 0
+
+    def add(self, first, second, scores, turns):
+        record = self.pairs.setdefault((first, second), [0, 0, 0])
+        for score in scores:
+            outcome = 0 if score == 1 else 1 if score == 0.5 else 2
+            record[outcome] += 1
+            self.totals[first][outcome] += 1
+            self.totals[second][2 - outcome] += 1
+        self.games += len(scores)
+        self.turns += turns
+
+    def record(self, first, second):
+        return self.pairs.get((first, second), [0, 0, 0])
+
+    def table(self):
+        """Lines of the standings: each player's Elo against the field, best first."""
+        rows = []
+        for player in self.players:
+            wins, draws, losses = self.totals[player]
+            elo, margin = elo_interval(wins, draws, losses)
+            rows.append((elo, margin, player, wins, draws, losses))
+        rows.sort(reverse=True)
+        width = max(len(player) for player in self.players)
+        lines = [f"{'player':<{width}} {'elo':>7} {'+/-':>6} {'games':>6} {'score':>6}  W/D/L"]
+        for elo, margin, player, wins, draws, losses in rows:
+            games = wins + draws + losses
+            score = (wins + draws / 2) / games if games else 0.0
+            lines.append(f"{player:<{width}} {elo:>+7.1f} {margin:>6.1f} {games:>6} {score:>6.3f}  "
+                         f"{wins}/{draws}/{losses}")
+        return lines
+
+
+def run_tournament(players, games, workers=None, seed=None, board_size=7, adjudicate_games=False,
+                   sprt=None, alpha=0.05, beta=0.05, progress_interval=10.0):
+    """Play a round robin (games per pairing, rounded up to whole pairs) and return the Standings.
+
+    sprt is (elo0, elo1) for a two-player match, which then stops as soon
+    as the test accepts either hypothesis; the decision is stored in
+    standings.sprt_result ("H0" or "H1", or None if the games ran out).
+    """
+    rng = random.Random(seed)
+    pairings = [(first, second) for index, first in enumerate(players) for second in players[index + 1:]]
+    tasks = [(first, second, rng.getrandbits(64)) for _ in range((games + 1) // 2) for first, second in pairings]
+    tasks.reverse()  # Popped from the end, so pairings interleave
+    standings = Standings(players)
+    standings.sprt_result = None
+    bounds = sprt_bounds(alpha, beta) if sprt else None
+    workers = workers or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    last_report = start
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+        while tasks or pending:
+            while tasks and len(pending) < workers * QUEUE_DEPTH:
+                first, second, task_seed = tasks.pop()
+                future = executor.submit(play_pair, first, second, task_seed, board_size, adjudicate_games)
+                pending[future] = (first, second)
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                first, second = pending.pop(future)
+                scores, turns = future.result()
+                standings.add(first, second, scores, turns)
+
+            if sprt:
+                llr = sprt_llr(*standings.record(*pairings[0]), *sprt)
+                if llr <= bounds[0] or llr >= bounds[1]:
+                    standings.sprt_result = "H1" if llr >= bounds[1] else "H0"
+                    for future in pending:
+                        future.cancel()
+                    break
+
+            now = time.perf_counter()
+            if progress_interval and now - last_report >= progress_interval:
+                last_report = now
+                print(progress_line(standings, pairings, now - start, sprt, bounds))
+    standings.seconds = time.perf_counter() - start
+    return standings
+
+
+def progress_line(standings, pairings, elapsed, sprt=None, bounds=None):
+    line = f"{standings.games} games, {standings.games / elapsed:.1f} games/s"
+    if len(pairings) == 1:
+        elo, margin = elo_interval(*standings.record(*pairings[0]))
+        line += f", {pairings[0][0]} vs {pairings[0][1]}: {elo:+.1f} +/- {margin:.1f}"
+        if sprt:
+            llr = sprt_llr(*standings.record(*pairings[0]), *sprt)
+            line += f", LLR {llr:.2f} ({bounds[0]:.2f}, {bounds[1]:.2f})"
+    return line
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play a round-robin tournament between WallGo players.")
+    parser.add_argument("players", nargs="+",
+                        help="player specs: random, greedy, search, search:NODES or search:SECONDSs")
+    parser.add_argument("--games", type=int, default=100, help="games per pairing (rounded up to whole pairs)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--size", type=int, default=7, help="board size")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--adjudicate", action="store_true", help="stop games once the outcome is decided")
+    parser.add_argument("--sprt", type=float, nargs=2, metavar=("ELO0", "ELO1"),
+                        help="for two players: stop once H0 (Elo difference ELO0) or H1 (ELO1) is accepted")
+    parser.add_argument("--alpha", type=float, default=0.05, help="SPRT false positive rate")
+    parser.add_argument("--beta", type=float, default=0.05, help="SPRT false negative rate")
+    parser.add_argument("--progress", type=float, default=10.0, help="seconds between progress lines (0 for none)")
+    args = parser.parse_args()
+
+    if len(args.players) < 2:
+        parser.error("a tournament needs at least two players")
+    if len(set(args.players)) != len(args.players):
+        parser.error("players must be different specs")
+    if args.sprt and len(args.players) != 2:
+        parser.error("--sprt needs exactly two players")
+    if not 2 <= args.size <= MAX_BOARD_SIZE:
+        parser.error(f"--size must be between 2 and {MAX_BOARD_SIZE}")
+    for spec in args.players:
+        try:
+            parse_player(spec)
+        except ValueError as error:
+            parser.error(str(error))
+
+    standings = run_tournament(args.players, args.games, args.workers, args.seed, args.size, args.adjudicate,
+                               args.sprt, args.alpha, args.beta, args.progress)
+    print(f"{standings.games} games, {standings.turns} turns in {standings.seconds:.1f}s "
+          f"({standings.games / standings.seconds:.1f} games/s)")
+    for line in standings.table():
+        print(line)
+    if len(args.players) == 2:
+        elo, margin = elo_interval(*standings.record(args.players[0], args.players[1]))
+        print(f"{args.players[0]} vs {args.players[1]}: {elo:+.1f} +/- {margin:.1f} Elo")
+    if args.sprt:
+        result = standings.sprt_result or "inconclusive"
+        print(f"SPRT [{args.sprt[0]:g}, {args.sprt[1]:g}]: {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Bounded transposition table keyed by Zobrist position hashes.
+
+Entries live in preallocated flat arrays (one array per field) instead of a
+dict of objects, so memory use is fixed by the size limit and never grows
+during a search.
+"""
+
+from array import array
+
+# Bound types stored with a value (0 marks an empty slot)
+EMPTY = 0
+EXACT = 1
+LOWER = 2  # Value is a lower bound (search failed high)
+UPPER = 3  # Value is an upper bound (search failed low)
+
+# Marker for "no best action stored"
+NO_ACTION = 0xFFFF
+
+# Replacement policies
+REPLACE_ALWAYS = "always"      # New entry always overwrites the slot
+REPLACE_DEPTH = "depth"        # Keep the deeper entry unless it is from an older search
+REPLACE_TWO_TIER = "two_tier"  # Buckets of two: a depth-preferred slot and an always-replace slot
+POLICIES = (REPLACE_ALWAYS, REPLACE_DEPTH, REPLACE_TWO_TIER)
+
+# Bytes per entry: key (8), value (4), depth (1), bound (1), best action (2), generation (1)
+ENTRY_BYTES = 17
+
+# Values are stored as signed 32-bit integers
+VALUE_MIN = -(1 << 31)
+VALUE_MAX = (1 << 31) - 1
+
+
+class TranspositionTable:
+    def __init__(self, max_bytes=64 * 1024 * 1024, policy=REPLACE_DEPTH):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown replacement policy {policy!r}, expected one of {POLICIES}")
+        self.policy = policy
+
+        # Largest power of two number of entries that fits the memory limit
+        entries = max(2, max_bytes // ENTRY_BYTES)
+        self.capacity = 1 << (entries.bit_length() - 1)
+        self.mask = self.capacity - 1
+        if policy == REPLACE_TWO_TIER:
+            # Index the first slot of each bucket
+            self.mask &= ~1
+
+        self.keys = array("Q", bytes(8 * self.capacity))
+        self.values = array("i", bytes(4 * self.capacity))
+        self.depths = array("b", bytes(self.capacity))
+        self.bounds = array("B", bytes(self.capacity))
+        self.best_actions = array("H", b"\xff\xff" * self.capacity)
+        self.generations = array("B", bytes(self.capacity))
+
+        # Search generation, bumped by new_search() so stale entries get replaced first
+        self.generation = 0
+
+        # Statistics
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def clear(self):
+        """Empty the table without reallocating it."""
+        for field in (self.keys, self.values, self.depths, self.bounds, self.generations):
+            field[:] = array(field.typecode, bytes(field.itemsize * self.capacity))
+        self.best_actions[:] = array("H", b"\xff\xff" * self.capacity)
+        self.generation = 0
+        self.probes = self.hits = self.stores = self.overwrites = 0
+
+    def new_search(self):
+        """Mark the start of a new search; entries from earlier searches age out."""
+        self.generation = (self.generation + 1) & 0xFF
+
+    def find(self, key):
+        """Return the slot index holding key, or -1."""
+        index = key & self.mask
+        if self.bounds[index] and self.keys[index] == key:
+            return index
+        if self.policy == REPLACE_TWO_TIER:
+            index += 1
+            if self.bounds[index] and self.keys[index] == key:
+                return index
+        return -1
+
+    def probe(self, key):
+        """Look up a position.
+
+        Returns (value, bound, depth, best_action) or None when the position is
+        not stored. best_action is NO_ACTION when no move was recorded.
+        """
+        self.probes += 1
+        index = self.find(key)
+        if index < 0:
+            return None
+        self.hits += 1
+        return self.values[index], self.bounds[index], self.depths[index], self.best_actions[index]
+
+    def store(self, key, value, bound, depth, best_action=NO_ACTION):
+        """Store a search result, subject to the replacement policy."""
+        index = self.slot_for(key, depth)
+        if index < 0:
+            return
+
+        if self.bounds[index] and self.keys[index] != key:
+            self.overwrites += 1
+        elif self.bounds[index] and best_action == NO_ACTION:
+            # Keep the move we already know for this position
+            best_action = self.best_actions[index]
+
+        self.keys[index] = key
+        self.values[index] = max(VALUE_MIN, min(VALUE_MAX, value))
+        self.depths[index] = max(-128, min(127, depth))
+        self.bounds[index] = bound
+        self.best_actions[index] = best_action
+        self.generations[index] = self.generation
+        self.stores += 1
+
+    def slot_for(self, key, depth):
+        """Choose the slot a new entry goes to, or -1 to drop it."""
+        index = key & self.mask
+
+        if self.policy == REPLACE_ALWAYS:
+            return index
+
+        if self.policy == REPLACE_TWO_TIER:
+            # Deep results go to the depth-preferred slot, the rest to the always-replace slot
+            if self.can_replace(index, depth):
+                return index
+            return index + 1
+
+        if self.can_replace(index, depth):
+            return index
+        return -1
+
+    def can_replace(self, index, depth):
+        """Depth-preferred test: may an entry of this depth replace the slot?"""
+        return (not self.bounds[index] or
+                self.generations[index] != self.generation or
+                depth >= self.depths[index])
+
+    def usage(self):
+        """Fraction of slots in use, sampled from the first 1000 slots."""
+        sample = min(1000, self.capacity)
+        return sum(1 for index in range(sample) if self.bounds[index]) / sample
+
+    def __len__(self):
+        return self.capacity
@@ -1,8 +1,15 @@
 import pygame
 import sys
 import random
+import argparse
+import os
 from game_logic import GameState
+from engine import MAX_BOARD_SIZE
 from renderer import GameRenderer
+from search import BackgroundSearch, BackgroundAnalysis
+from opening_book import OpeningBook
+from client import NetworkClient, parse_address
+from game_record import restore_snapshot
 
 # Initialize pygame
 pygame.init()
@@ -11,23 +18,27 @@ pygame.init()
 WINDOW_SIZE = 800
 SCREEN_TITLE = "WallGo - Red vs Blue"
 
+# Board size (N x N), e.g. python wallgo.py --size 25
+parser = argparse.ArgumentParser(description="WallGo - Red vs Blue")
+parser.add_argument("--size", type=int, default=7, help="board size (default 7)")
+parser.add_argument("--connect", metavar="HOST[:PORT]", help="play online against an opponent from a server.py server")
+parser.add_argument("--watch", type=int, metavar="MATCH", help="with --connect, watch a running match instead of playing")
+args, _ = parser.parse_known_args()  # Ignore arguments added by app bundles
+if args.size > MAX_BOARD_SIZE:
+    parser.error(f"--size must be at most {MAX_BOARD_SIZE}")
+BOARD_SIZE = max(2, args.size)  # Room for the four pieces
+
 # Create the game window
 screen = pygame.display.set_mode((WINDOW_SIZE, WINDOW_SIZE))
 pygame.display.set_caption(SCREEN_TITLE)
 
 # Initialize game state and renderer
-game_state = GameState()
+game_state = GameState(BOARD_SIZE)
 game_state.debug = True  # Enable debug output
-renderer = GameRenderer(screen, WINDOW_SIZE)
+renderer = GameRenderer(screen, WINDOW_SIZE, BOARD_SIZE)
 
 # Function to randomize piece placement
 def randomize_pieces():
-    # Clear any existing pieces
-    game_state.pieces = [
-        [None, None],  # Red pieces
-        [None, None]   # Blue pieces
-    ]
-    
     # Generate 4 unique random positions
     positions = []
     while len(positions) < 4:
@@ -36,16 +47,128 @@ def randomize_pieces():
         if (row, col) not in positions:
             positions.append((row, col))
     
-    # Assign positions to pieces
-    game_state.pieces[0][0] = positions[0]  # Red piece 1
-    game_state.pieces[0][1] = positions[1]  # Red piece 2
-    game_state.pieces[1][0] = positions[2]  # Blue piece 1
-    game_state.pieces[1][1] = positions[3]  # Blue piece 2
+    # Assign positions to pieces (Red 1, Red 2, Blue 1, Blue 2) and skip the setup phase
+    game_state.place_pieces(positions)
+
+# Computer players (toggled with the 1 and 2 keys)
+computer_players = [False, False]  # Red, Blue
+computer_time_limit = 2.0  # Seconds of search per turn
+computer_search = BackgroundSearch()
+
+# Opening book for instant computer moves in known positions (build one with opening_book.py)
+OPENING_BOOK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening_book.bin")
+opening_book = OpeningBook(OPENING_BOOK_FILE) if os.path.exists(OPENING_BOOK_FILE) else None
+
+def update_computer_player():
+    """Start a search on the computer's turn and play its move once it is ready."""
+    if game_state.phase != "select" or not computer_players[game_state.current_player] or not local_turn():
+        return
+    
+    result = computer_search.poll()
+    if result is not None and result.best_action is not None and computer_search.position == game_state.hash:
+        game_state.apply_action(result.best_action)
+    elif not computer_search.running():
+        # Known opening positions are answered from the book without searching
+        book_action = opening_book.best_action(game_state) if opening_book is not None else None
+        if book_action is not None:
+            game_state.apply_action(book_action)
+            return
+        
+        # Search a copy so the board can keep being drawn while the computer thinks
+        computer_search.start(game_state.clone(), computer_time_limit)
+        game_state.message = f"{game_state.player_colors[game_state.current_player]}'s turn: Computer is thinking..."
+
+# Online play: the server pairs us with an opponent and relays the turns
+network = NetworkClient(*parse_address(args.connect)) if args.connect else None
+
+def join_network_match():
+    global game_state
+    game_state = GameState(BOARD_SIZE)
+    game_state.debug = True
+    if args.watch is not None:
+        game_state.message = f"Connecting to match {args.watch}..."
+        network.watch(args.watch)
+    else:
+        game_state.message = "Waiting for an opponent..."
+        network.join(BOARD_SIZE)
+
+def update_network():
+    """Send our completed turns to the server and play the opponent's turns."""
+    global game_state
+    if game_state.last_turn is not None:
+        player, action = game_state.last_turn
+        game_state.last_turn = None
+        if player == network.player:
+            network.send_move(action)
+    
+    for message in network.poll():
+        command = message[0]
+        if command == "START":
+            computer_search.cancel()
+            game_state = GameState(network.board_size)
+            game_state.debug = True
+            game_state.place_pieces(network.setup, network.first_player)
+            game_state.last_turn = None
+        elif command == "SNAPSHOT":
+            # Watching: start from the current position of the match
+            computer_search.cancel()
+            game_state = GameState(network.board_size)
+            game_state.debug = True
+            restore_snapshot(game_state, network.snapshot)
+        elif command == "MOVE" and int(message[1]) != network.player:
+            game_state.apply_action(int(message[2]))
+            game_state.last_turn = None
+        elif command == "LEFT":
+            network.player = None
+            if args.watch is not None:
+                game_state.message = "A player left, the match is over"
+            else:
+                game_state.message = "Your opponent left. Click 'Restart Game' for a new match"
+        elif command == "ERROR":
+            game_state.message = "Server: " + " ".join(message[1:])
     
-    # Skip setup phase
-    game_state.phase = "select"
-    game_state.current_player = random.randint(0, 1)  # Randomly choose Red (0) or Blue (1) to start
-    game_state.message = f"{game_state.player_colors[game_state.current_player]}'s turn: Select a piece"
+    if not network.connected and game_state.phase != "game_over":
+        game_state.message = "Disconnected from the server"
+
+def local_turn():
+    """Whether the current player is played on this computer (always, unless online)."""
+    return network is None or game_state.current_player == network.player
+
+if network is not None:
+    join_network_match()
+
+# Analysis mode (toggled with the H key): a background search of the position
+# on screen suggests a turn for the player to move
+show_hints = False
+analysis = BackgroundAnalysis()
+
+def analysis_wanted():
+    """Whether there is a turn to suggest: a game in progress with a human to move."""
+    if not show_hints or game_state.phase in ("setup", "game_over"):
+        return False
+    return not (computer_players[game_state.current_player] and local_turn())
+
+def update_analysis():
+    """Follow the game with the analysis and return the hint to draw, if any."""
+    if not analysis_wanted():
+        return None
+    # The hint stays on the position at the start of the turn while the turn is played
+    if game_state.phase == "select":
+        analysis.analyse(game_state)
+    return analysis.latest()
+
+def toggle_hints():
+    global show_hints
+    show_hints = not show_hints
+    if not show_hints:
+        analysis.cancel()
+
+def toggle_computer_player(player):
+    computer_players[player] = not computer_players[player]
+    if not computer_players[player] and game_state.phase == "select" and game_state.current_player == player:
+        # Hand the turn back to the human
+        computer_search.cancel()
+        game_state.message = f"{game_state.player_colors[player]}'s turn: Select a piece"
 
 # Create buttons with enhanced styling
 def create_button(text, x, y, width, height, color, hover_color, text_color):
@@ -111,7 +234,7 @@ class RulesWindow:
         self.rules_sections = [
             ("Overview", [
                 "WallGo is a two-player abstract strategy game",
-                "played on a 7x7 grid. Each player controls two",
+                f"played on a {BOARD_SIZE}x{BOARD_SIZE} grid. Each player controls two",
                 "pieces (Red vs Blue) and strategically moves them",
                 "around the board, placing walls to block movement."
             ]),
@@ -127,7 +250,7 @@ class RulesWindow:
                 "• Move in an L-shape (one step, then one perpendicular)",
                 "• Stay in place (after 2-second delay)",
                 "• Cannot move through walls or off the board",
-                "• Cannot move isolated pieces (in 1x1 squares)"
+                "• Isolated pieces (1x1) cannot move; with both, you pass"
             ]),
             ("Wall Placement", [
                 "• After moving, place a wall adjacent to your piece",
@@ -155,7 +278,7 @@ class RulesWindow:
             self.window_size[0],
             self.window_size[1]
         )
-        pygame.draw.rect(screen, (0, 0, 0, 100), shadow_rect, 0, 15)
+        renderer.mark_dirty(pygame.draw.rect(screen, (0, 0, 0, 100), shadow_rect, 0, 15))
         
         # Draw main window
         window_rect = pygame.Rect(
@@ -164,35 +287,35 @@ class RulesWindow:
             self.window_size[0],
             self.window_size[1]
         )
-        pygame.draw.rect(screen, (240, 248, 255), window_rect, 0, 15)  # Light blue background
-        pygame.draw.rect(screen, (70, 130, 180), window_rect, 3, 15)   # Steel blue border
+        renderer.mark_dirty(pygame.draw.rect(screen, (240, 248, 255), window_rect, 0, 15))  # Light blue background
+        renderer.mark_dirty(pygame.draw.rect(screen, (70, 130, 180), window_rect, 3, 15))   # Steel blue border
         
         # Draw title
         title = self.title_font.render("Game Rules", True, (25, 25, 25))
         title_rect = title.get_rect(center=(self.position[0] + self.window_size[0]//2, self.position[1] + 25))
-        screen.blit(title, title_rect)
+        renderer.mark_dirty(screen.blit(title, title_rect))
         
         # Draw close button
         button_color = self.close_button["hover_color"] if self.close_button["is_hovered"] else self.close_button["color"]
-        pygame.draw.rect(screen, button_color, self.close_button["rect"], 0, 5)
-        pygame.draw.rect(screen, (255, 255, 255), self.close_button["rect"], 2, 5)
+        renderer.mark_dirty(pygame.draw.rect(screen, button_color, self.close_button["rect"], 0, 5))
+        renderer.mark_dirty(pygame.draw.rect(screen, (255, 255, 255), self.close_button["rect"], 2, 5))
         
         close_text = self.small_font.render(self.close_button["text"], True, self.close_button["text_color"])
         close_rect = close_text.get_rect(center=self.close_button["rect"].center)
-        screen.blit(close_text, close_rect)
+        renderer.mark_dirty(screen.blit(close_text, close_rect))
         
         # Draw rules sections
         y_offset = 70
         for section_title, rules in self.rules_sections:
             # Draw section title
             title = self.font.render(section_title, True, (25, 25, 25))
-            screen.blit(title, (self.position[0] + 20, self.position[1] + y_offset))
+            renderer.mark_dirty(screen.blit(title, (self.position[0] + 20, self.position[1] + y_offset)))
             y_offset += 28  # Further reduced spacing
             
             # Draw rules
             for rule in rules:
                 text = self.small_font.render(rule, True, (50, 50, 50))
-                screen.blit(text, (self.position[0] + 30, self.position[1] + y_offset))
+                renderer.mark_dirty(screen.blit(text, (self.position[0] + 30, self.position[1] + y_offset)))
                 y_offset += 22  # Further reduced spacing
             
             y_offset += 8  # Further reduced spacing between sections
@@ -220,15 +343,31 @@ rules_window = RulesWindow(WINDOW_SIZE)
 # Font for buttons
 button_font = pygame.font.SysFont("Arial", 20)
 
+def draw_button(button):
+    # Each draw reports its region to the renderer, which presents only what changed
+    button_color = button["hover_color"] if button["is_hovered"] else button["color"]
+    renderer.mark_dirty(pygame.draw.rect(screen, (0, 0, 0, 100), button["rect"].move(3, 3), 0, 10))  # Shadow
+    renderer.mark_dirty(pygame.draw.rect(screen, button_color, button["rect"], 0, 10))
+    renderer.mark_dirty(pygame.draw.rect(screen, (255, 255, 255), button["rect"], 2, 10))  # Border
+    
+    text_surf = button_font.render(button["text"], True, button["text_color"])
+    text_rect = text_surf.get_rect(center=button["rect"].center)
+    renderer.mark_dirty(screen.blit(text_surf, text_rect))
+
 # Game loop
 clock = pygame.time.Clock()
 running = True
 
 while running:
+    frame_start = pygame.time.get_ticks()
+    
     # Handle events
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             running = False
+        elif event.type == pygame.WINDOWEXPOSED:
+            # Only changed regions are presented, so repaint everything the window system lost
+            renderer.invalidate()
         elif event.type == pygame.MOUSEBUTTONDOWN:
             if event.button == 1:  # Left click
                 mouse_pos = pygame.mouse.get_pos()
@@ -242,21 +381,37 @@ while running:
                     # Check if restart button was clicked
                     if restart_button["rect"].collidepoint(mouse_pos):
                         # Reset the game
-                        game_state = GameState()
-                        game_state.debug = True  # Enable debug output
+                        computer_search.cancel()
+                        if network is not None:
+                            join_network_match()
+                        else:
+                            game_state = GameState(BOARD_SIZE)
+                            game_state.debug = True  # Enable debug output
                     
                     # Check if random button was clicked during setup phase
-                    elif game_state.phase == "setup" and random_button["rect"].collidepoint(mouse_pos):
+                    elif game_state.phase == "setup" and network is None and random_button["rect"].collidepoint(mouse_pos):
                         randomize_pieces()
                     
                     # Check if rules button was clicked
                     elif rules_button["rect"].collidepoint(mouse_pos):
                         rules_window.visible = True
                     
-                    # Otherwise handle game board clicks
-                    else:
+                    # Otherwise handle game board clicks (unless the computer or the online opponent is playing this turn)
+                    elif network is not None and (network.player is None or not local_turn()):
+                        pass
+                    elif game_state.phase == "setup" or not computer_players[game_state.current_player]:
                         game_state.handle_click(mouse_pos, renderer.get_cell_size(), renderer.margin)
         
+        elif event.type == pygame.KEYDOWN:
+            # 1 and 2 toggle computer control of Red and Blue
+            if event.key == pygame.K_1:
+                toggle_computer_player(0)
+            elif event.key == pygame.K_2:
+                toggle_computer_player(1)
+            # H toggles the analysis hints
+            elif event.key == pygame.K_h:
+                toggle_hints()
+        
         elif event.type == pygame.MOUSEMOTION:
             mouse_pos = pygame.mouse.get_pos()
             # Update button hover states
@@ -269,50 +424,47 @@ while running:
     # Update game state
     game_state.update()
     
-    # Render the game
-    renderer.render(game_state)
+    # Let the computer play its turns
+    update_computer_player()
     
-    # Draw buttons with hover effects
-    # Restart button
-    button_color = restart_button["hover_color"] if restart_button["is_hovered"] else restart_button["color"]
-    pygame.draw.rect(screen, (0, 0, 0, 100), restart_button["rect"].move(3, 3), 0, 10)  # Shadow
-    pygame.draw.rect(screen, button_color, restart_button["rect"], 0, 10)
-    pygame.draw.rect(screen, (255, 255, 255), restart_button["rect"], 2, 10)  # Border
+    # Exchange turns with the server
+    if network is not None:
+        update_network()
     
-    text_surf = button_font.render(restart_button["text"], True, restart_button["text_color"])
-    text_rect = text_surf.get_rect(center=restart_button["rect"].center)
-    screen.blit(text_surf, text_rect)
+    # Follow the game with the analysis
+    hint = update_analysis()
     
-    # Random button (only during setup phase)
-    if game_state.phase == "setup":
-        button_color = random_button["hover_color"] if random_button["is_hovered"] else random_button["color"]
-        pygame.draw.rect(screen, (0, 0, 0, 100), random_button["rect"].move(3, 3), 0, 10)  # Shadow
-        pygame.draw.rect(screen, button_color, random_button["rect"], 0, 10)
-        pygame.draw.rect(screen, (255, 255, 255), random_button["rect"], 2, 10)  # Border
-        
-        text_surf = button_font.render(random_button["text"], True, random_button["text_color"])
-        text_rect = text_surf.get_rect(center=random_button["rect"].center)
-        screen.blit(text_surf, text_rect)
+    # Render the game
+    renderer.render(game_state, hint)
     
-    # Rules button
-    button_color = rules_button["hover_color"] if rules_button["is_hovered"] else rules_button["color"]
-    pygame.draw.rect(screen, (0, 0, 0, 100), rules_button["rect"].move(3, 3), 0, 10)  # Shadow
-    pygame.draw.rect(screen, button_color, rules_button["rect"], 0, 10)
-    pygame.draw.rect(screen, (255, 255, 255), rules_button["rect"], 2, 10)  # Border
+    # Draw buttons with hover effects
+    draw_button(restart_button)
+    
+    # Random button (only during setup phase of a local game)
+    if game_state.phase == "setup" and network is None:
+        draw_button(random_button)
     
-    text_surf = button_font.render(rules_button["text"], True, rules_button["text_color"])
-    text_rect = text_surf.get_rect(center=rules_button["rect"].center)
-    screen.blit(text_surf, text_rect)
+    draw_button(rules_button)
     
     # Draw rules window if visible
     rules_window.draw(screen)
     
-    # Update the display
-    pygame.display.flip()
+    # Update the parts of the display that changed
+    pygame.display.update(renderer.updated_rects())
+    
+    # Let the computer (or else the analysis) think for the rest of the frame,
+    # keeping a few milliseconds for its search to pause before the next frame starts
+    spare_time = (1000 / 60 - (pygame.time.get_ticks() - frame_start) - 4) / 1000
+    if computer_search.running():
+        computer_search.run_for(spare_time)
+    elif analysis_wanted():
+        analysis.run_for(spare_time)
     
     # Cap the frame rate
     clock.tick(60)
 
 # Clean up
+if network is not None:
+    network.close()
 pygame.quit()
 sys.exit()
@@ -15,9 +15,22 @@ a = Analysis(
 )
 pyz = PYZ(a.pure)
 
-# Add game_logic.py and renderer.py to the data files
+# Add the game modules to the data files
 a.datas += [('game_logic.py', 'game_logic.py', 'DATA')]
 a.datas += [('renderer.py', 'renderer.py', 'DATA')]
+a.datas += [('bitboard.py', 'bitboard.py', 'DATA')]
+a.datas += [('engine.py', 'engine.py', 'DATA')]
+a.datas += [('zobrist.py', 'zobrist.py', 'DATA')]
+a.datas += [('transposition.py', 'transposition.py', 'DATA')]
+a.datas += [('search.py', 'search.py', 'DATA')]
+a.datas += [('territory.py', 'territory.py', 'DATA')]
+a.datas += [('adjudication.py', 'adjudication.py', 'DATA')]
+a.datas += [('selfplay.py', 'selfplay.py', 'DATA')]
+a.datas += [('symmetry.py', 'symmetry.py', 'DATA')]
+a.datas += [('opening_book.py', 'opening_book.py', 'DATA')]
+a.datas += [('game_record.py', 'game_record.py', 'DATA')]
+a.datas += [('server.py', 'server.py', 'DATA')]
+a.datas += [('client.py', 'client.py', 'DATA')]
 
 exe = EXE(
     pyz,
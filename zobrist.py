@@ -0,0 +1,58 @@
+"""Zobrist keys for hashing WallGo positions.
+
+A position key is the XOR of one random 64-bit key per (player, cell) piece
+placement, one per wall that is present and one for Blue to move. Moving a
+piece or adding a wall then only needs one or two XORs to update the key.
+"""
+
+import random
+
+# Key tables are shared by every engine with the same board size
+_tables = {}
+
+
+class ZobristKeys:
+    def __init__(self, board_size):
+        self.board_size = board_size
+
+        # Fixed seed per board size so keys (and stored hashes) are the same in every process
+        rng = random.Random(f"wallgo-zobrist-{board_size}")
+
+        # pieces[player][row * board_size + col]
+        self.pieces = [[rng.getrandbits(64) for _ in range(board_size * board_size)] for _ in range(2)]
+
+        # walls[wall_type][row][col], same layout as GameState.walls
+        self.walls = [
+            [[rng.getrandbits(64) for _ in range(board_size)] for _ in range(board_size + 1)],  # Horizontal walls
+            [[rng.getrandbits(64) for _ in range(board_size + 1)] for _ in range(board_size)]   # Vertical walls
+        ]
+
+        # XORed in when Blue is to move
+        self.side = rng.getrandbits(64)
+
+    def piece(self, player, row, col):
+        return self.pieces[player][row * self.board_size + col]
+
+    def hash_position(self, walls, pieces, current_player):
+        """Compute the key of a position from scratch."""
+        key = 0
+        for wall_type in range(2):
+            for row, wall_row in enumerate(walls[wall_type]):
+                for col, present in enumerate(wall_row):
+                    if present:
+                        key ^= self.walls[wall_type][row][col]
+        for player in range(2):
+            for piece in pieces[player]:
+                if piece is not None:
+                    key ^= self.piece(player, *piece)
+        if current_player == 1:
+            key ^= self.side
+        return key
+
+
+def zobrist_keys(board_size):
+    """Return the shared key tables for a board size."""
+    keys = _tables.get(board_size)
+    if keys is None:
+        keys = _tables[board_size] = ZobristKeys(board_size)
+    return keys